@@ -0,0 +1,51 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from api import views
+from api.serializers import POST_FIELDS, serialize
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает JSON API и HTML-ленту: время сериализации '
+            'страницы постов и число запросов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--fields', default='')
+
+    def measure(self, name, func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            size = len(func())
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        self.stdout.write(f'{name:<24}{elapsed:9.2f} мс {size:9} байт')
+
+    def handle(self, *args, **options):
+        posts = list(Post.objects.select_related('author', 'group')
+                     [:options['posts']])
+        names = [name for name in options['fields'].split(',') if name]
+        names = names or list(POST_FIELDS)
+        repeat = options['repeat']
+        self.stdout.write(f'Постов на странице: {len(posts)}')
+        self.measure('json', lambda: json.dumps(
+            [serialize(post, POST_FIELDS, names) for post in posts],
+            cls=DjangoJSONEncoder), repeat)
+        self.measure('html', lambda: render_to_string(
+            'posts/includes/post_list.html', {'page_obj': posts}), repeat)
+
+        request = RequestFactory().get('/api/v1/posts/', {
+            'limit': options['posts'], 'fields': options['fields']})
+        with CaptureQueriesContext(connection) as queries:
+            self.measure('api view', lambda: views.index(request).content,
+                         repeat)
+        self.stdout.write(f'Запросов на страницу API: '
+                          f'{len(queries) / repeat:.1f}')
@@ -0,0 +1,60 @@
+def user_data(user):
+    return {'username': user.username,
+            'full_name': user.get_full_name()}
+
+
+def group_data(group):
+    if group is None:
+        return None
+    return {'slug': group.slug, 'title': group.title}
+
+
+def image_data(post):
+    if not post.image:
+        return None
+    return {'url': post.image.url,
+            'width': post.image_width,
+            'height': post.image_height,
+            'color': post.image_color}
+
+
+# Поле ответа -> (функция, связи для select_related).
+POST_FIELDS = {
+    'id': (lambda post: post.pk, ()),
+    'text': (lambda post: post.text, ()),
+    'pub_date': (lambda post: post.pub_date, ()),
+    'author': (lambda post: user_data(post.author), ('author',)),
+    'group': (lambda post: group_data(post.group), ('group',)),
+    'image': (image_data, ()),
+}
+COMMENT_FIELDS = {
+    'id': (lambda comment: comment.pk, ()),
+    'text': (lambda comment: comment.text, ()),
+    'created': (lambda comment: comment.created, ()),
+    'author': (lambda comment: user_data(comment.author), ('author',)),
+}
+
+
+class UnknownField(ValueError):
+    pass
+
+
+def select_fields(available, requested):
+    """Поля из ?fields=, по умолчанию все."""
+    if not requested:
+        return list(available)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise UnknownField(', '.join(unknown))
+    return names
+
+
+def related(available, names):
+    """Связи, которые надо подтянуть одним JOIN для выбранных полей."""
+    return sorted({relation for name in names
+                   for relation in available[name][1]})
+
+
+def serialize(obj, available, names):
+    return {name: available[name][0](obj) for name in names}
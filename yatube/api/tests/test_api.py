@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.authors = [User.objects.create_user(f'author{i}')
+                       for i in range(3)]
+        cls.groups = [Group.objects.create(title=f'Группа {i}',
+                                           slug=f'group{i}')
+                      for i in range(2)]
+        for i in range(9):
+            Post.objects.create(author=cls.authors[i % 3],
+                                group=cls.groups[i % 2],
+                                text=f'Пост {i}')
+        cls.post = Post.objects.first()
+        for i in range(3):
+            Comment.objects.create(author=cls.user, post=cls.post,
+                                   text=f'Комментарий {i}')
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def walk(self, url, **params):
+        """Проходит все страницы по курсору"""
+        results = []
+        while url:
+            data = self.client.get(url, params).json()
+            params = {}
+            results.extend(data['results'])
+            url = data['next']
+        return results
+
+    def test_cursor_walks_whole_feed_in_order(self):
+        """Курсор проходит ленту целиком без повторов"""
+        results = self.walk(reverse('api:index'), limit=4)
+        self.assertEqual([item['id'] for item in results],
+                         list(Post.objects.values_list('pk', flat=True)))
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Авторы и группы подтягиваются в том же запросе"""
+        url = reverse('api:index')
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {'limit': 9}).json()
+        self.assertEqual(data['results'][0]['author']['username'],
+                         self.post.author.username)
+        self.assertEqual(data['results'][0]['group']['slug'],
+                         self.post.group.slug)
+
+    def test_fields_selection(self):
+        """?fields= оставляет только выбранные поля"""
+        data = self.client.get(reverse('api:index'),
+                               {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.client.get(reverse('api:index'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_group_profile_and_follow_feeds(self):
+        """Ленты группы, автора и подписок"""
+        group = self.walk(reverse('api:group_posts',
+                                  args=[self.groups[0].slug]))
+        self.assertEqual(len(group), 5)
+        profile = self.walk(reverse('api:profile_posts',
+                                    args=[self.authors[1].username]))
+        self.assertEqual({item['author']['username'] for item in profile},
+                         {'author1'})
+        self.assertEqual(
+            self.client.get(reverse('api:follow_posts')).status_code, 401)
+        follow = self.authorized_client.get(
+            reverse('api:follow_posts')).json()
+        self.assertEqual(len(follow['results']), 3)
+
+    def test_post_detail_comments_and_follow_graph(self):
+        """Пост, комментарии и подписки пользователя"""
+        detail = self.client.get(
+            reverse('api:post_detail', args=[self.post.pk])).json()
+        self.assertEqual(detail['text'], self.post.text)
+        comments = self.walk(
+            reverse('api:post_comments', args=[self.post.pk]), limit=2)
+        self.assertEqual([item['text'] for item in comments],
+                         ['Комментарий 0', 'Комментарий 1',
+                          'Комментарий 2'])
+        followers = self.client.get(reverse(
+            'api:followers', args=[self.authors[0].username])).json()
+        self.assertEqual(followers['results'][0]['username'], 'Random_user')
+        following = self.client.get(reverse(
+            'api:following', args=[self.user.username])).json()
+        self.assertEqual(following['results'][0]['username'], 'author0')
+        self.assertEqual(self.client.get(
+            reverse('api:post_detail', args=[0])).status_code, 404)
+
+    def test_invalid_cursor(self):
+        """Испорченный курсор — 400, а не 500"""
+        for cursor in ('abc', 'WyJ4IiwieSJd'):
+            response = self.client.get(reverse('api:index'),
+                                       {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+    def test_benchmark_command(self):
+        """Команда сравнения JSON и HTML отрабатывает"""
+        out = StringIO()
+        call_command('benchmark_api', '--repeat=1', stdout=out)
+        self.assertIn('json', out.getvalue())
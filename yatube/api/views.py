@@ -0,0 +1,138 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from core.pagination import InvalidCursor, cursor_page
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                          Group, Post)
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, UnknownField,
+                          related, select_fields, serialize, user_data)
+
+User = get_user_model()
+POST_ORDERING = ('-pub_date', '-pk')
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """Только GET, ошибки — JSON с полем detail."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return error('Метод не разрешён', 405)
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return error('Не найдено', 404)
+        except UnknownField as unknown:
+            return error(f'Неизвестные поля: {unknown}', 400)
+        except InvalidCursor:
+            return error('Неверный курсор', 400)
+    return wrapper
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        limit = settings.API_PAGE_SIZE
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+
+def page_response(request, querysets, ordering, serialize_item):
+    items, cursor = cursor_page(querysets, ordering,
+                                request.GET.get('cursor'),
+                                page_size(request))
+    next_url = None
+    if cursor:
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        next_url = f'{request.path}?{query.urlencode()}'
+    return JsonResponse({'results': [serialize_item(item) for item in items],
+                         'next': next_url})
+
+
+def posts_response(request, *querysets):
+    names = select_fields(POST_FIELDS, request.GET.get('fields'))
+    relations = related(POST_FIELDS, names)
+    querysets = [queryset.select_related(*relations)
+                 for queryset in querysets]
+    return page_response(request, querysets, POST_ORDERING,
+                         lambda post: serialize(post, POST_FIELDS, names))
+
+
+@api_view
+def index(request):
+    return posts_response(request, Post.objects.all())
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return posts_response(request, group.posts.all(),
+                          group.archived_posts.all())
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return posts_response(request, author.posts.all(),
+                          author.archived_posts.all())
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', 401)
+    return posts_response(request, Post.objects.filter(
+        author__following__user=request.user))
+
+
+def find_post(post_id, names=()):
+    relations = related(POST_FIELDS, names)
+    for model in (Post, ArchivedPost):
+        post = model.objects.select_related(*relations).filter(
+            pk=post_id).first()
+        if post is not None:
+            return post
+    raise Http404
+
+
+@api_view
+def post_detail(request, post_id):
+    names = select_fields(POST_FIELDS, request.GET.get('fields'))
+    return JsonResponse(serialize(find_post(post_id, names),
+                                  POST_FIELDS, names))
+
+
+@api_view
+def post_comments(request, post_id):
+    names = select_fields(COMMENT_FIELDS, request.GET.get('fields'))
+    model = (ArchivedComment if isinstance(find_post(post_id), ArchivedPost)
+             else Comment)
+    comments = model.objects.filter(post_id=post_id).select_related(
+        *related(COMMENT_FIELDS, names))
+    return page_response(request, comments, ('pk',),
+                         lambda comment: serialize(comment, COMMENT_FIELDS,
+                                                   names))
+
+
+@api_view
+def followers(request, username):
+    author = get_object_or_404(User, username=username)
+    follows = Follow.objects.filter(author=author).select_related('user')
+    return page_response(request, follows, ('-pk',),
+                         lambda follow: user_data(follow.user))
+
+
+@api_view
+def following(request, username):
+    user = get_object_or_404(User, username=username)
+    follows = Follow.objects.filter(user=user).select_related('author')
+    return page_response(request, follows, ('-pk',),
+                         lambda follow: user_data(follow.author))
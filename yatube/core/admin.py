@@ -0,0 +1,60 @@
+from django.contrib import admin
+from django.db.models import OuterRef, Subquery
+
+from .models import Deletion, OutgoingEmail, Task
+
+
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """Удаление из админки скрывает объект и ставит задачу на очистку.
+
+    Подкласс задаёт soft_delete = staticmethod(функция мягкого удаления).
+    Страница подтверждения не собирает каскад: у активного автора он
+    тянет в память все посты и комментарии.
+    """
+    soft_delete = None
+
+    def get_queryset(self, request):
+        # Ход удаления приходит в том же запросе, что и список.
+        deletions = Deletion.objects.filter(label=self.opts.label_lower,
+                                            object_id=OuterRef('pk'))
+        return super().get_queryset(request).annotate(
+            deletion_step=Subquery(deletions.values('step')[:1]),
+            deletion_deleted=Subquery(deletions.values('deleted')[:1]))
+
+    def delete_model(self, request, obj):
+        self.soft_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.soft_delete(obj)
+
+    def get_deleted_objects(self, objs, request):
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return [str(obj) for obj in objs], {}, perms_needed, []
+
+    def deletion_progress(self, obj):
+        step = getattr(obj, 'deletion_step', None)
+        if step is None:
+            return None
+        return f'{step}: {obj.deletion_deleted}'
+    deletion_progress.short_description = 'Удаление'
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'priority', 'attempts',
+                    'run_at')
+    list_filter = ('status', 'name')
+    empty_value_display = '-пусто-'
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'subject', 'created', 'sent', 'attempts')
+    list_filter = ('sent',)
+    search_fields = ('subject', 'recipients')
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Task, TaskAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+        from .auth import forget_saved_user
+        post_save.connect(forget_saved_user, sender=settings.AUTH_USER_MODEL)
+        post_delete.connect(forget_saved_user,
+                            sender=settings.AUTH_USER_MODEL)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_user(user_id):
+    """Убирает пользователя из кэша; зовётся при любом его изменении."""
+    cache.delete(user_key(user_id))
+
+
+def forget_saved_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кэша.
+
+    AuthenticationMiddleware спрашивает пользователя на каждом запросе;
+    из базы он читается только после изменения или истечения кэша.
+    Хэш пароля приходит вместе с объектом, поэтому проверка сессии
+    после смены пароля продолжает работать.
+    """
+
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
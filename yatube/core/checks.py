@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Поколения лент живут в кэше: процессы должны видеть один кэш."""
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            'Кэш по умолчанию свой у каждого процесса.',
+            hint='Поколения лент для ETag сдвигаются только в том процессе, '
+                 'где изменились данные, остальные отдают 304 на '
+                 'устаревшие страницы. Настройте Memcached или Redis.',
+            id='core.W001',
+        )]
+    return []
+
+
+@register(deploy=True)
+def check_session_cache(app_configs, **kwargs):
+    """Сессии и пользователи в кэше требуют кэша, общего для процессов."""
+    cached = (settings.SESSION_ENGINE == 'core.sessions'
+              or 'core.auth.CachedModelBackend'
+              in settings.AUTHENTICATION_BACKENDS)
+    local = settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES
+    if cached and local:
+        return [Error(
+            'Сессии или пользователи кэшируются в кэше процесса.',
+            hint='Выход, смена пароля и отключение аккаунта сбрасывают '
+                 'кэш только в своём процессе, остальные продолжают '
+                 'пускать по старой сессии. Настройте Memcached или '
+                 'Redis либо верните стандартные SESSION_ENGINE и '
+                 'AUTHENTICATION_BACKENDS.',
+            id='core.E002',
+        )]
+    return []
@@ -0,0 +1,27 @@
+import logging
+
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import Deletion
+
+logger = logging.getLogger(__name__)
+
+
+def deletion_progress(obj):
+    """Сколько строк уже удалено и на каком шаге фоновое удаление obj."""
+    return Deletion.objects.filter(
+        label=obj._meta.label_lower, object_id=obj.pk).values(
+        'step', 'deleted').first()
+
+
+def report(label, pk, step, rows):
+    """Прибавляет rows удалённых строк к ходу удаления и запоминает шаг."""
+    Deletion.objects.bulk_create(
+        [Deletion(label=label, object_id=pk, step=step)],
+        ignore_conflicts=True)
+    Deletion.objects.filter(label=label, object_id=pk).update(
+        step=step, deleted=F('deleted') + rows, updated=timezone.now())
+    metrics.incr('deletion.rows', rows)
+    logger.info('Удаление %s %s: %s, строк %s', label, pk, step, rows)
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Q
+from django.utils import timezone
+
+from . import metrics
+from .models import OutgoingEmail
+from .tasks import release_key, task
+
+logger = logging.getLogger(__name__)
+
+
+def dedup_key(message):
+    recipients = ','.join(sorted(message.recipients()))
+    return hashlib.sha1(
+        f'{recipients}\n{message.subject}'.encode()).hexdigest()
+
+
+def to_row(message):
+    html = next((content for content, mimetype
+                 in getattr(message, 'alternatives', ())
+                 if mimetype == 'text/html'), '')
+    return OutgoingEmail(
+        subject=message.subject,
+        body=message.body,
+        html_body=html,
+        from_email=message.from_email,
+        recipients=json.dumps({'to': message.to, 'cc': message.cc,
+                               'bcc': message.bcc,
+                               'reply_to': message.reply_to}),
+        headers=json.dumps(message.extra_headers),
+        dedup_key=dedup_key(message),
+    )
+
+
+def to_message(row, connection):
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email,
+        headers=json.loads(row.headers),
+        connection=connection,
+        **json.loads(row.recipients),
+    )
+    if row.html_body:
+        message.attach_alternative(row.html_body, 'text/html')
+    return message
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Кладёт письма в таблицу, отправляет их фоновая задача."""
+
+    def send_messages(self, email_messages):
+        window = timezone.now() - timedelta(
+            seconds=settings.OUTBOX_DEDUP_WINDOW)
+        rows = []
+        for message in email_messages:
+            row = to_row(message)
+            # Повторный запрос сброса пароля на тот же адрес не рождает
+            # новое письмо, пока предыдущее свежее.
+            if OutgoingEmail.objects.filter(dedup_key=row.dedup_key,
+                                            created__gte=window).exists():
+                metrics.incr('email.deduplicated')
+                continue
+            rows.append(row)
+        OutgoingEmail.objects.bulk_create(rows)
+        metrics.incr('email.queued', len(rows))
+        if rows:
+            schedule_flush()
+        return len(rows)
+
+
+def schedule_flush():
+    # Одна задача на окно OUTBOX_FLUSH_DELAY собирает все письма за него.
+    flush_outbox.enqueue(countdown=settings.OUTBOX_FLUSH_DELAY,
+                         key='outbox:flush')
+
+
+def claim_batch(last_pk, token):
+    """Помечает токеном следующую пачку писем и возвращает её.
+
+    Письмо забирается условным UPDATE, как задачи в claim_tasks: два
+    одновременных сброса не отправят его дважды. Пометку умершего
+    отправителя можно перехватить через OUTBOX_CLAIM_TIMEOUT.
+    """
+    now = timezone.now()
+    free = Q(claimed__isnull=True) | Q(claimed__lt=now - timedelta(
+        seconds=settings.OUTBOX_CLAIM_TIMEOUT))
+    candidates = list(OutgoingEmail.objects
+                      .filter(free, sent__isnull=True, pk__gt=last_pk,
+                              attempts__lt=settings.OUTBOX_MAX_ATTEMPTS)
+                      .order_by('pk')
+                      .values_list('pk', flat=True)
+                      [:settings.OUTBOX_BATCH_SIZE])
+    if not candidates:
+        return None, []
+    OutgoingEmail.objects.filter(free, pk__in=candidates,
+                                 sent__isnull=True).update(
+        claimed=now, claim_token=token)
+    batch = list(OutgoingEmail.objects.filter(
+        pk__in=candidates, claim_token=token, sent__isnull=True)
+        .order_by('pk'))
+    return candidates[-1], batch
+
+
+@task(priority=5)
+def flush_outbox():
+    """Отправляет накопленные письма пачками через одно соединение."""
+    # Письма, пришедшие во время отправки, соберёт следующая задача.
+    release_key('outbox:flush')
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    token = uuid.uuid4().hex
+    last_pk = failed = 0
+    with connection:
+        while True:
+            last_pk, batch = claim_batch(last_pk, token)
+            if last_pk is None:
+                break
+            failed += send_batch(batch, connection)
+    if failed:
+        schedule_flush()
+
+
+def send_batch(batch, connection):
+    sent, failed = [], []
+    for row in batch:
+        try:
+            to_message(row, connection).send()
+        except Exception as error:
+            logger.exception('Письмо %s не отправлено', row.pk)
+            row.attempts += 1
+            row.error = str(error)
+            row.claimed = None
+            row.claim_token = ''
+            failed.append(row)
+        else:
+            sent.append(row)
+    now = timezone.now()
+    OutgoingEmail.objects.filter(pk__in=[row.pk for row in sent]).update(
+        sent=now)
+    OutgoingEmail.objects.bulk_update(
+        failed, ('attempts', 'error', 'claimed', 'claim_token'))
+    for row in sent:
+        metrics.timing('email.delivery', (now - row.created).total_seconds())
+    metrics.incr('email.sent', len(sent))
+    metrics.incr('email.failed', len(failed))
+    return len(failed)
@@ -0,0 +1,45 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Считает запросы к базе и время на запрос страницы '
+            'от вошедшего пользователя')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--url', default='/')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def measure(self, name, client, url, repeat, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                response = client.get(url, **headers)
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+        self.stdout.write(f'{name:<16}{response.status_code:5}'
+                          f'{elapsed:9.2f} мс '
+                          f'{len(queries) / repeat:6.1f} запросов')
+        return response
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Нет такого пользователя')
+        client = Client()
+        client.force_login(user)
+        url, repeat = options['url'], options['repeat']
+        # Первый запрос прогревает кэш сессии, пользователя и страницы.
+        response = client.get(url)
+        self.measure('GET', client, url, repeat)
+        if response.has_header('ETag'):
+            self.measure('GET 304', client, url, repeat,
+                         HTTP_IF_NONE_MATCH=response['ETag'])
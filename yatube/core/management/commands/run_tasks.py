@@ -0,0 +1,59 @@
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.ratelimit import flush_throttled
+from core.tasks import claim_tasks, queue_depth, requeue_stale, run_task
+
+POOLS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+
+def execute(pk):
+    try:
+        return run_task(pk)
+    finally:
+        # Потоки и процессы пула держат свои соединения с базой.
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет отложенные задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=settings.TASKS_WORKERS)
+        parser.add_argument('--pool', choices=POOLS, default='thread')
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.TASKS_POLL_INTERVAL)
+        parser.add_argument('--burst', action='store_true',
+                            help='Завершиться, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        workers = options['workers']
+        # Дочерние процессы не должны унаследовать открытое соединение.
+        connections.close_all()
+        flush_at = 0
+        with POOLS[options['pool']](max_workers=workers) as pool:
+            while True:
+                if time.monotonic() >= flush_at:
+                    flush_throttled()
+                    flush_at = (time.monotonic()
+                                + settings.METRICS_FLUSH_INTERVAL)
+                requeue_stale()
+                depth = sum(queue_depth().values())
+                claimed = claim_tasks(workers * 2, worker)
+                if not claimed:
+                    if options['burst']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                results = list(pool.map(execute, claimed))
+                self.stdout.write(
+                    f'В очереди: {depth}, выполнено: {results.count(True)}, '
+                    f'с ошибкой: {results.count(False)}')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core import metrics
+from core.models import Task
+from core.ratelimit import flush_throttled
+from core.tasks import queue_depth
+
+
+class Command(BaseCommand):
+    help = 'Показывает длину очереди задач и накопленные метрики'
+
+    def handle(self, *args, **options):
+        for priority, count in sorted(queue_depth().items(), reverse=True):
+            self.stdout.write(f'priority {priority}: {count}')
+        statuses = (Task.objects.values_list('status')
+                    .annotate(count=Count('pk')).order_by())
+        for status, count in statuses:
+            self.stdout.write(f'{status}: {count}')
+        flush_throttled()
+        for name, value in metrics.snapshot().items():
+            self.stdout.write(f'{name} = {value}')
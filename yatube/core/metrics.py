@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.db.models import BigIntegerField, Case, F, Value, When
+
+from .models import Metric
+
+
+def add(deltas):
+    """Прибавляет {имя: приращение} к счётчикам в базе двумя запросами.
+
+    Счётчики лежат в базе, поэтому их видят все процессы и воркеры.
+    """
+    Metric.objects.bulk_create([Metric(name=name) for name in deltas],
+                               ignore_conflicts=True)
+    Metric.objects.filter(name__in=deltas).update(value=F('value') + Case(
+        *(When(name=name, then=Value(delta))
+          for name, delta in deltas.items()),
+        default=Value(0), output_field=BigIntegerField()))
+
+
+def incr(name, delta=1):
+    add({name: delta})
+
+
+def buffer_key(name):
+    return f'metrics:buffer:{name}'
+
+
+def buffer(name, delta=1):
+    """Прибавляет к счётчику в кэше, не трогая базу.
+
+    Для горячих путей вроде ответа 429: в Metric накопленное переносит
+    flush, который периодически вызывает воркер задач.
+    """
+    key = buffer_key(name)
+    if not cache.add(key, delta, None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, None)
+
+
+def flush(names):
+    """Переносит накопленные в кэше счётчики names в базу."""
+    names = list(names)
+    found = cache.get_many([buffer_key(name) for name in names])
+    deltas = {}
+    for name in names:
+        value = found.get(buffer_key(name))
+        if not value:
+            continue
+        # decr, а не delete: прибавленное после get_many не потеряется.
+        # Если два воркера перенесли одно и то же, в кэше останется
+        # минус, и следующий flush вычтет лишнее.
+        try:
+            cache.decr(buffer_key(name), value)
+        except ValueError:
+            continue
+        deltas[name] = value
+    if deltas:
+        add(deltas)
+
+
+def gauge(name, value):
+    """Запоминает текущее значение, например длину очереди."""
+    Metric.objects.bulk_create([Metric(name=name)], ignore_conflicts=True)
+    Metric.objects.filter(name=name).update(value=value)
+
+
+def timed(name, seconds):
+    """Приращения для замера: число замеров и сумма в миллисекундах."""
+    return {f'{name}.count': 1, f'{name}.total_ms': int(seconds * 1000)}
+
+
+def timing(name, seconds):
+    add(timed(name, seconds))
+
+
+def snapshot():
+    return dict(Metric.objects.order_by('name').values_list('name', 'value'))
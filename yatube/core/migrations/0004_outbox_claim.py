@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_task_key_metric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='claim_token',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='claimed',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
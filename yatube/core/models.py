@@ -0,0 +1,86 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=200)
+    payload = models.TextField()
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    created = models.DateTimeField(auto_now_add=True)
+    run_at = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    # Пока задача с ключом ждёт или выполняется, вторую такую же не
+    # поставить: уникальность проверяет база, а не кэш процесса.
+    key = models.CharField(max_length=255, null=True, blank=True,
+                           unique=True)
+
+    class Meta:
+        indexes = (models.Index(fields=('status', '-priority', 'run_at'),
+                                name='task_queue_idx'),)
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
+
+
+class OutgoingEmail(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = models.TextField()
+    headers = models.TextField(default='{}')
+    dedup_key = models.CharField(max_length=40, db_index=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Отправитель сначала помечает пачку своим токеном, и письмо уходит
+    # только у того, чей UPDATE успел первым.
+    claimed = models.DateTimeField(null=True, blank=True)
+    claim_token = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        indexes = (models.Index(fields=('sent', 'id'),
+                                name='outbox_unsent_idx'),)
+
+    def __str__(self):
+        return self.subject
+
+
+class Metric(models.Model):
+    name = models.CharField(max_length=200, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name} = {self.value}'
+
+
+class Deletion(models.Model):
+    """Ход фонового удаления объекта: его видит админка любого процесса."""
+    label = models.CharField(max_length=100)
+    object_id = models.PositiveIntegerField()
+    step = models.CharField(max_length=50)
+    deleted = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = (models.UniqueConstraint(
+            fields=('label', 'object_id'), name='unique_deletion'),)
+
+    def __str__(self):
+        return f'{self.label} {self.object_id}: {self.step}'
@@ -0,0 +1,78 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime.datetime)
+              else value for value in values]
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as error:
+        raise InvalidCursor(str(error))
+    if not isinstance(values, list):
+        raise InvalidCursor('Курсор должен быть списком')
+    return values
+
+
+def keyset_filter(ordering, values):
+    """Условие «строго после values» для сортировки ordering.
+
+    Для ('-pub_date', '-pk') это pub_date < v0 OR (pub_date = v0 AND
+    pk < v1): база идёт по индексу, а не пропускает OFFSET строк.
+    """
+    if len(values) != len(ordering):
+        raise InvalidCursor('Курсор не подходит к сортировке')
+    condition = Q()
+    equal = {}
+    for name, value in zip(ordering, values):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{field}__{lookup}': value})
+        equal[field] = value
+    return condition
+
+
+def cursor_values(obj, ordering):
+    return [getattr(obj, name.lstrip('-')) for name in ordering]
+
+
+def cursor_page(querysets, ordering, cursor=None, page_size=20):
+    """Страница по курсору и курсор следующей страницы.
+
+    querysets читаются по очереди: следующий начинается, когда в
+    предыдущем кончились строки (так свежие посты переходят в архив).
+    Возвращает (объекты, курсор или None).
+    """
+    if not isinstance(querysets, (list, tuple)):
+        querysets = [querysets]
+    after = decode_cursor(cursor) if cursor else None
+    items = []
+    for queryset in querysets:
+        queryset = queryset.order_by(*ordering)
+        if after is not None:
+            try:
+                queryset = queryset.filter(keyset_filter(ordering, after))
+            except (ValueError, TypeError, ValidationError) as error:
+                raise InvalidCursor(str(error))
+        # Лишняя строка показывает, есть ли следующая страница.
+        items.extend(queryset[:page_size + 1 - len(items)])
+        if len(items) > page_size:
+            break
+    if len(items) > page_size:
+        items = items[:page_size]
+        return items, encode_cursor(cursor_values(items[-1], ordering))
+    return items, None
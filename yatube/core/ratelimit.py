@@ -0,0 +1,82 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import metrics
+
+
+def client_address(request):
+    """Адрес клиента с учётом доверенных прокси.
+
+    За прокси REMOTE_ADDR — адрес самого прокси, поэтому адрес берётся
+    из RATELIMIT_PROXY_HEADER. Начало X-Forwarded-For клиент может
+    подделать, так что верим записи, которую дописал
+    RATELIMIT_PROXY_COUNT-й прокси с конца.
+    """
+    header = settings.RATELIMIT_PROXY_HEADER
+    if header:
+        addresses = [address.strip() for address
+                     in request.META.get(header, '').split(',')
+                     if address.strip()]
+        if addresses:
+            return addresses[-min(settings.RATELIMIT_PROXY_COUNT,
+                                  len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request):
+    """Пользователь, если он вошёл, иначе адрес клиента."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_address(request)}'
+
+
+def take_token(scope, key, now=None):
+    """Забирает токен из корзины scope для key.
+
+    Возвращает 0, если токен был, иначе число секунд до следующего.
+    """
+    capacity, period = settings.RATELIMITS[scope]
+    rate = capacity / period
+    now = time.time() if now is None else now
+    cache_key = f'ratelimit:{scope}:{key}'
+    tokens, updated = cache.get(cache_key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    # Между get и set другой запрос может забрать тот же токен: лимит
+    # мягкий, зато корзина обходится одним чтением и одной записью.
+    cache.set(cache_key, (tokens - 1, now), period)
+    return 0
+
+
+def throttled_metric(scope):
+    return f'ratelimit.{scope}.throttled'
+
+
+def flush_throttled():
+    """Переносит в базу число ответов 429 по всем scope."""
+    metrics.flush(throttled_metric(scope) for scope in settings.RATELIMITS)
+
+
+def ratelimit(scope, methods=('POST',)):
+    """Отвечает 429, когда клиент исчерпал лимит записей в scope."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLED and request.method in methods:
+                wait = take_token(scope, client_key(request))
+                if wait:
+                    metrics.buffer(throttled_metric(scope))
+                    response = HttpResponse('Слишком много запросов',
+                                            status=429,
+                                            content_type='text/plain')
+                    response['Retry-After'] = math.ceil(wait)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
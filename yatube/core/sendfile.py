@@ -0,0 +1,113 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Один диапазон байтов из заголовка Range или None."""
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        # bytes=-500 — последние 500 байт.
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def range_header(request, last_modified):
+    """Range, если If-Range нет или он совпадает с Last-Modified.
+
+    ETag файлы не получают, поэтому If-Range с ETag или другой датой
+    значит, что у клиента другая версия, и отдать надо весь файл.
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is not None and if_range.strip() != last_modified:
+        return None
+    return request.META.get('HTTP_RANGE')
+
+
+def local_response(request, path, size, content_type, last_modified):
+    try:
+        byte_range = parse_range(range_header(request, last_modified), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        # Открытый файл целиком WSGI-сервер отдаёт через wsgi.file_wrapper,
+        # то есть sendfile() без копирования в память воркера.
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(read_range(path, start, length),
+                                         status=206,
+                                         content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def sendfile(request, path, document_root):
+    """Отдаёт файл через фронтовой сервер или, если его нет, сам."""
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    stat = os.stat(fullpath)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+
+    content_type = (mimetypes.guess_type(fullpath)[0]
+                    or 'application/octet-stream')
+    last_modified = http_date(stat.st_mtime)
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header == 'X-Accel-Redirect':
+        response = HttpResponse(content_type=content_type)
+        # nginx раскодирует URI внутреннего перенаправления.
+        response[header] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+    elif header == 'X-Sendfile':
+        response = HttpResponse(content_type=content_type)
+        response[header] = fullpath
+    else:
+        response = local_response(request, fullpath, stat.st_size,
+                                  content_type, last_modified)
+    response['Last-Modified'] = last_modified
+    return response
@@ -0,0 +1,72 @@
+"""Сессии в кэше с отложенной записью в базу.
+
+Подключается через SESSION_ENGINE = 'core.sessions'.
+"""
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.contrib.sessions.backends import cached_db, db
+from django.middleware.csrf import CSRF_SESSION_KEY
+
+from .tasks import task
+
+# Вход, выход и смена CSRF-токена пишутся в базу сразу: процесс, не
+# нашедший сессию в кэше, не должен прочитать из базы прежнее состояние.
+WRITE_THROUGH_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                      CSRF_SESSION_KEY)
+
+
+class SessionStore(cached_db.SessionStore):
+    """Читает сессию из кэша, в базу пишет с задержкой.
+
+    Новая сессия, смена вошедшего пользователя и CSRF-токена попадают
+    в базу сразу: они не должны теряться, если кэш вытеснит запись.
+    Кэш должен быть общим для процессов (см. core.checks). Остальные
+    изменения сразу видны в кэше, а в базу последнее состояние переносит
+    persist_session — не чаще раза в SESSION_WRITE_BEHIND_DELAY секунд.
+    """
+    stored_auth = None
+
+    @property
+    def dirty_key(self):
+        return f'{self.cache_key}:dirty'
+
+    @staticmethod
+    def auth_state(data):
+        return tuple(data.get(key) for key in WRITE_THROUGH_KEYS)
+
+    def load(self):
+        data = super().load()
+        self.stored_auth = self.auth_state(data)
+        return data
+
+    def save(self, must_create=False):
+        state = self.auth_state(self._get_session())
+        if (must_create or self.session_key is None
+                or state != self.stored_auth):
+            super().save(must_create)
+            self.stored_auth = state
+            return
+        self._cache.set(self.cache_key, self._get_session(),
+                        self.get_expiry_age())
+        if self._cache.add(self.dirty_key, True,
+                           settings.SESSION_WRITE_BEHIND_DELAY):
+            persist_session.enqueue(
+                [self.session_key],
+                countdown=settings.SESSION_WRITE_BEHIND_DELAY)
+
+    def persist(self):
+        """Переносит в базу состояние сессии из кэша, если оно там есть."""
+        # Флаг снимается до чтения: правка после него поставит новую задачу.
+        self._cache.delete(self.dirty_key)
+        data = self._cache.get(self.cache_key)
+        if data is None:
+            return False
+        self._session_cache = data
+        db.SessionStore.save(self)
+        return True
+
+
+@task(priority=5)
+def persist_session(session_key):
+    SessionStore(session_key).persist()
@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_HASH_RE = re.compile(r'(^|/)[0-9a-f]{64}\.\w+$')
+STATIC_HASH_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.ico', '.json', '.txt',
+                           '.xml', '.map')
+
+
+def is_content_addressed(name):
+    """Имя файла получено из хэша содержимого и никогда не меняется."""
+    return bool(CONTENT_HASH_RE.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под хэшем содержимого, одинаковые файлы — в одном."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    @staticmethod
+    def hashed_name(name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + extension)
+
+
+post_image_storage = ContentAddressedStorage()
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем в имени и готовыми .gz рядом с файлами."""
+
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            for name in self.hashed_files.values():
+                if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            if self.exists(name + '.gz'):
+                self.delete(name + '.gz')
+            self._save(name + '.gz', ContentFile(compressed))
+
+    def stored_name(self, name):
+        # Пока collectstatic не запускали, отдаём имя без хэша,
+        # а не падаем на каждом {% static %}.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
@@ -0,0 +1,149 @@
+import functools
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFunction:
+    """Функция, которую можно выполнить сразу или отложить в очередь."""
+
+    def __init__(self, func, priority=0, max_attempts=3):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, priority=None, countdown=0,
+                key=None):
+        """Кладёт вызов в очередь в текущей транзакции.
+
+        Если задача с тем же key уже ждёт или выполняется, новая не
+        ставится и возвращается None.
+        """
+        kwargs = kwargs or {}
+        if settings.TASKS_EAGER:
+            return self.func(*args, **kwargs)
+        try:
+            with transaction.atomic():
+                task = Task.objects.create(
+                    name=self.name,
+                    payload=json.dumps({'args': list(args),
+                                        'kwargs': kwargs}),
+                    priority=self.priority if priority is None else priority,
+                    max_attempts=self.max_attempts,
+                    run_at=timezone.now() + timedelta(seconds=countdown),
+                    key=key,
+                )
+        except IntegrityError:
+            return None
+        metrics.incr('tasks.enqueued')
+        return task
+
+
+def release_key(key):
+    """Снимает key с выполняющейся задачи, чтобы можно было поставить
+    следующую: вызывать в начале задачи, которая сама себя перезапускает.
+    """
+    Task.objects.filter(key=key, status=Task.RUNNING).update(key=None)
+
+
+def task(func=None, *, priority=0, max_attempts=3):
+    """Декоратор: @task или @task(priority=10, max_attempts=5)."""
+    if func is None:
+        return functools.partial(task, priority=priority,
+                                 max_attempts=max_attempts)
+    return TaskFunction(func, priority, max_attempts)
+
+
+def claim_tasks(limit, worker):
+    """Забирает до limit готовых задач, самые приоритетные первыми."""
+    now = timezone.now()
+    candidates = (Task.objects
+                  .filter(status=Task.QUEUED, run_at__lte=now)
+                  .order_by('-priority', 'run_at', 'pk')
+                  .values_list('pk', flat=True)[:limit])
+    claimed = []
+    for pk in list(candidates):
+        # Условный UPDATE вместо SELECT FOR UPDATE: задачу получит только
+        # тот воркер, чей запрос первым сменит статус.
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+                status=Task.RUNNING, started=now, worker=worker):
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, чей воркер умер посреди работы."""
+    deadline = timezone.now() - timedelta(
+        seconds=settings.TASKS_VISIBILITY_TIMEOUT)
+    return Task.objects.filter(status=Task.RUNNING,
+                               started__lt=deadline).update(
+        status=Task.QUEUED, worker='')
+
+
+def run_task(pk):
+    """Выполняет задачу из очереди и удаляет её при успехе."""
+    task = Task.objects.get(pk=pk)
+    # Метрики задачи пишутся одной пачкой после выполнения.
+    wait = metrics.timed('tasks.wait',
+                         (task.started - task.run_at).total_seconds())
+    payload = json.loads(task.payload)
+    start = timezone.now()
+    try:
+        import_string(task.name).func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        metrics.add(wait)
+        fail_task(task, traceback.format_exc())
+        return False
+    task.delete()
+    metrics.add({**wait, 'tasks.done': 1, **metrics.timed(
+        'tasks.run', (timezone.now() - start).total_seconds())})
+    return True
+
+
+def fail_task(task, error):
+    task.attempts += 1
+    task.error = error
+    task.worker = ''
+    if task.attempts < task.max_attempts:
+        task.status = Task.QUEUED
+        task.run_at = timezone.now() + timedelta(
+            seconds=settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1))
+        metrics.incr('tasks.retried')
+    else:
+        task.status = Task.FAILED
+        # Упавшая задача не должна навсегда занимать свой ключ.
+        task.key = None
+        metrics.incr('tasks.failed')
+        logger.error('Задача %s (%s) упала: %s', task.pk, task.name, error)
+    task.save(update_fields=('attempts', 'error', 'worker', 'status',
+                             'run_at', 'key'))
+
+
+def queue_depth():
+    """Число задач в очереди по приоритетам."""
+    depth = dict(Task.objects.filter(status=Task.QUEUED)
+                 .values_list('priority')
+                 .annotate(count=Count('pk'))
+                 .order_by())
+    metrics.gauge('tasks.depth', sum(depth.values()))
+    return depth
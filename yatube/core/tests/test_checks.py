@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import check_session_cache, check_shared_cache
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_local_cache_is_reported(self):
+        """Кэш, свой у каждого процесса, даёт предупреждение"""
+        self.assertEqual([warning.id for warning in check_shared_cache(None)],
+                         ['core.W001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211'}})
+    def test_shared_cache_passes(self):
+        """Общий кэш проверку проходит"""
+        self.assertEqual(check_shared_cache(None), [])
+
+    def test_cached_sessions_require_shared_cache(self):
+        """Сессии в кэше процесса — ошибка, стандартные — нет"""
+        self.assertEqual([error.id for error in check_session_cache(None)],
+                         ['core.E002'])
+        with self.settings(
+                SESSION_ENGINE='django.contrib.sessions.backends.db',
+                AUTHENTICATION_BACKENDS=[
+                    'django.contrib.auth.backends.ModelBackend']):
+            self.assertEqual(check_session_cache(None), [])
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import metrics
+from core.mail import flush_outbox
+from core.models import OutgoingEmail, Task
+
+User = get_user_model()
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+
+
+@override_settings(EMAIL_BACKEND='core.mail.OutboxEmailBackend',
+                   OUTBOX_EMAIL_BACKEND='core.tests.test_mail.CountingBackend')
+class OutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        CountingBackend.opened = 0
+
+    def test_password_reset_is_queued_and_deduplicated(self):
+        """Письмо сброса пароля ставится в очередь один раз"""
+        User.objects.create_user('Random_user', email='user@example.com',
+                                 password='pass')
+        for _ in range(3):
+            self.client.post(reverse('users:password_reset'),
+                             data={'email': 'user@example.com'})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        self.assertEqual(Task.objects.filter(
+            name='core.mail.flush_outbox').count(), 1)
+        self.assertEqual(metrics.snapshot()['email.deduplicated'], 2)
+
+        flush_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        self.assertIsNotNone(OutgoingEmail.objects.get().sent)
+
+    @override_settings(OUTBOX_BATCH_SIZE=2)
+    def test_flush_uses_one_connection(self):
+        """Все пачки уходят через одно соединение"""
+        for number in range(5):
+            EmailMessage(f'Тема {number}', 'Текст', 'from@example.com',
+                         [f'{number}@example.com']).send()
+        flush_outbox()
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertFalse(OutgoingEmail.objects.filter(
+            sent__isnull=True).exists())
+        self.assertEqual(metrics.snapshot()['email.sent'], 5)
+
+    def test_claimed_rows_are_not_sent_twice(self):
+        """Письма, забранные другим отправителем, не уходят повторно"""
+        for number in range(2):
+            EmailMessage(f'Тема {number}', 'Текст', 'from@example.com',
+                         [f'{number}@example.com']).send()
+        first, second = OutgoingEmail.objects.order_by('pk')
+        OutgoingEmail.objects.filter(pk=first.pk).update(
+            claimed=timezone.now(), claim_token='other')
+        OutgoingEmail.objects.filter(pk=second.pk).update(
+            claimed=timezone.now() - timedelta(
+                seconds=settings.OUTBOX_CLAIM_TIMEOUT + 1),
+            claim_token='dead')
+        flush_outbox()
+        self.assertEqual([message.to for message in mail.outbox],
+                         [['1@example.com']])
+        first.refresh_from_db()
+        self.assertIsNone(first.sent)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import shutil
+
+from django.test import TestCase, override_settings
+from django.conf import settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        for name in ('posts/image.jpg', 'posts/.hidden',
+                     'posts/мой файл%.jpg'):
+            with open(os.path.join(TEMP_MEDIA_ROOT, name), 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_local_fallback_serves_whole_file(self):
+        """Без фронтового сервера файл отдаётся целиком"""
+        response = self.client.get('/media/posts/image.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_local_fallback_supports_ranges(self):
+        """Запрос диапазона получает 206 и нужные байты"""
+        ranges = {
+            'bytes=10-19': (CONTENT[10:20], 'bytes 10-19/1024'),
+            'bytes=1000-': (CONTENT[1000:], 'bytes 1000-1023/1024'),
+            'bytes=-4': (CONTENT[-4:], 'bytes 1020-1023/1024'),
+        }
+        for header, (content, content_range) in ranges.items():
+            with self.subTest(header=header):
+                response = self.client.get('/media/posts/image.jpg',
+                                           HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(b''.join(response.streaming_content),
+                                 content)
+        response = self.client.get('/media/posts/image.jpg',
+                                   HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_if_range_must_match(self):
+        """Диапазон отдаётся, только если If-Range совпал с Last-Modified"""
+        url = '/media/posts/image.jpg'
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19',
+                                   HTTP_IF_RANGE=last_modified)
+        self.assertEqual(response.status_code, 206)
+        for if_range in ('"etag"', 'Mon, 01 Jan 2001 00:00:00 GMT'):
+            response = self.client.get(url, HTTP_RANGE='bytes=10-19',
+                                       HTTP_IF_RANGE=if_range)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_offload_headers(self):
+        """С фронтовым сервером Django отдаёт только заголовок"""
+        with self.settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect'):
+            response = self.client.get('/media/posts/image.jpg')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/image.jpg')
+        self.assertEqual(response.content, b'')
+
+        with self.settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect'):
+            response = self.client.get('/media/posts/мой файл%25.jpg')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/'
+                         '%D0%BC%D0%BE%D0%B9%20%D1%84%D0%B0%D0%B9%D0%BB'
+                         '%25.jpg')
+
+        with self.settings(MEDIA_SENDFILE_HEADER='X-Sendfile'):
+            response = self.client.get('/media/posts/image.jpg')
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(TEMP_MEDIA_ROOT, 'posts/image.jpg'))
+
+    def test_forbidden_paths(self):
+        """Скрытые файлы и выход за MEDIA_ROOT не отдаются"""
+        for path in ('/media/posts/.hidden', '/media/../manage.py',
+                     '/media/posts/missing.jpg'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 404)
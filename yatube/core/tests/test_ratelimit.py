@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.ratelimit import flush_throttled, take_token
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(RATELIMITS={'comment': (2, 60), 'signup': (1, 60)})
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_bucket_refills_over_time(self):
+        """Токены возвращаются со скоростью capacity / period"""
+        self.assertEqual(take_token('comment', 'key', now=0), 0)
+        self.assertEqual(take_token('comment', 'key', now=0), 0)
+        self.assertEqual(take_token('comment', 'key', now=0), 30)
+        self.assertEqual(take_token('comment', 'key', now=30), 0)
+        self.assertEqual(take_token('comment', 'other', now=30), 0)
+
+    def test_comments_are_throttled(self):
+        """Сверх лимита комментарий не пишется и приходит 429"""
+        url = reverse('posts:add_comment', kwargs={'post_id': self.post.pk})
+        for _ in range(2):
+            self.authorized_client.post(url, data={'text': 'Комментарий'})
+        # Сессия и пользователь берутся из кэша, счётчик 429 тоже.
+        with self.assertNumQueries(0):
+            response = self.authorized_client.post(
+                url, data={'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.authorized_client.post(url, data={'text': 'Комментарий'})
+        flush_throttled()
+        flush_throttled()
+        self.assertEqual(metrics.snapshot()['ratelimit.comment.throttled'],
+                         2)
+
+    def test_signup_is_limited_by_address(self):
+        """Регистрация ограничивается по адресу клиента"""
+        url = reverse('users:signup')
+        self.client.post(url, data={})
+        self.assertEqual(self.client.post(url, data={}).status_code, 429)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(RATELIMIT_PROXY_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_signup_behind_proxy_uses_forwarded_address(self):
+        """За прокси лимит считается по адресу, который дописал прокси"""
+        url = reverse('users:signup')
+        first = {'REMOTE_ADDR': '10.0.0.1',
+                 'HTTP_X_FORWARDED_FOR': '1.1.1.1, 203.0.113.1'}
+        self.client.post(url, data={}, **first)
+        # Подделанное начало заголовка не меняет ключ.
+        spoofed = {'REMOTE_ADDR': '10.0.0.1',
+                   'HTTP_X_FORWARDED_FOR': '2.2.2.2, 203.0.113.1'}
+        self.assertEqual(
+            self.client.post(url, data={}, **spoofed).status_code, 429)
+        other = {'REMOTE_ADDR': '10.0.0.1',
+                 'HTTP_X_FORWARDED_FOR': '203.0.113.2'}
+        self.assertNotEqual(
+            self.client.post(url, data={}, **other).status_code, 429)
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.middleware.csrf import CSRF_SESSION_KEY
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.models import Task
+from core.sessions import SessionStore, persist_session
+from posts.deletion import soft_delete
+
+User = get_user_model()
+
+
+class CachedSessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user', password='pass')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def stored(self, session_key):
+        return Session.objects.get(pk=session_key).get_decoded()
+
+    def test_changes_are_written_behind(self):
+        """Изменение сессии сразу видно в кэше, а в базу идёт задачей"""
+        session = SessionStore()
+        session['step'] = 1
+        session.create()
+        session = SessionStore(session.session_key)
+        session['step'] = 2
+        session.save()
+        session['step'] = 3
+        session.save()
+
+        self.assertEqual(SessionStore(session.session_key)['step'], 3)
+        self.assertEqual(self.stored(session.session_key)['step'], 1)
+        self.assertEqual(
+            Task.objects.filter(name=persist_session.name).count(), 1)
+
+        persist_session(session.session_key)
+        self.assertEqual(self.stored(session.session_key)['step'], 3)
+
+    def test_login_survives_cache_loss(self):
+        """Вход пишется в базу сразу и переживает очистку кэша"""
+        cache.clear()
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_page_needs_no_queries(self):
+        """Вошедший пользователь получает 304 без запросов к базе"""
+        url = reverse('posts:index')
+        etag = self.authorized_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_password_change_ends_cached_sessions(self):
+        """После смены пароля кэшированный пользователь не пускается"""
+        self.authorized_client.get(reverse('posts:index'))
+        self.user.set_password('new-pass')
+        self.user.save()
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_soft_deleted_user_is_logged_out(self):
+        """Отключённый пользователь выходит, хотя был в кэше"""
+        self.authorized_client.get(reverse('posts:index'))
+        soft_delete(self.user)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_csrf_rotation_is_written_through(self):
+        """Новый CSRF-токен в сессии сразу попадает в базу"""
+        session = SessionStore()
+        session.create()
+        session = SessionStore(session.session_key)
+        session[CSRF_SESSION_KEY] = 'token'
+        session.save()
+        self.assertEqual(self.stored(session.session_key)[CSRF_SESSION_KEY],
+                         'token')
+
+    def test_sessions_of_plain_model_backend_stay_valid(self):
+        """Сессии, открытые через ModelBackend, не разлогиниваются"""
+        client = Client()
+        client.force_login(
+            User.objects.get(pk=self.user.pk),
+            backend='django.contrib.auth.backends.ModelBackend')
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import shutil
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.conf import settings
+
+TEMP_STATIC_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CSS = b'body { background: url("../img/logo.png"); }\n' * 50
+
+
+@override_settings(STATICFILES_DIRS=[TEMP_STATIC_DIR],
+                   STATIC_ROOT=TEMP_STATIC_ROOT, SERVE_STATIC=True)
+class StaticPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_STATIC_DIR, 'css'))
+        os.makedirs(os.path.join(TEMP_STATIC_DIR, 'img'))
+        with open(os.path.join(TEMP_STATIC_DIR, 'css', 'site.css'),
+                  'wb') as css:
+            css.write(CSS)
+        with open(os.path.join(TEMP_STATIC_DIR, 'img', 'logo.png'),
+                  'wb') as logo:
+            logo.write(b'png')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_DIR, ignore_errors=True)
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed = staticfiles_storage.stored_name('css/site.css')
+
+    def test_collectstatic_fingerprints_and_compresses(self):
+        """collectstatic добавляет хэш к имени и кладёт рядом .gz"""
+        self.assertRegex(self.hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        self.assertTrue(staticfiles_storage.exists(self.hashed + '.gz'))
+        url = Template("{% load static %}{% static 'css/site.css' %}").render(
+            Context())
+        self.assertEqual(url, f'/static/{self.hashed}')
+
+    def test_precompressed_file_is_served_immutable(self):
+        """Сжатая копия отдаётся с вечным кэшем"""
+        response = self.client.get(f'/static/{self.hashed}',
+                                   HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('immutable', response['Cache-Control'])
+
+        response = self.client.get(f'/static/{self.hashed}')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content).count(b'body'),
+                         50)
+
+    def test_gzip_refused_with_zero_quality(self):
+        """gzip;q=0 означает отказ от сжатия"""
+        for header in ('gzip;q=0', 'br, gzip; q=0.0, *;q=1',
+                       'identity, *;q=0'):
+            response = self.client.get(f'/static/{self.hashed}',
+                                       HTTP_ACCEPT_ENCODING=header)
+            self.assertFalse(response.has_header('Content-Encoding'), header)
+        response = self.client.get(f'/static/{self.hashed}',
+                                   HTTP_ACCEPT_ENCODING='*;q=0.5')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    @override_settings(SERVE_STATIC=False)
+    def test_static_is_not_served_when_disabled(self):
+        """Без SERVE_STATIC статику Django не отдаёт"""
+        response = self.client.get(f'/static/{self.hashed}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_unhashed_file_is_not_immutable(self):
+        """Файл без хэша в имени не кэшируется навсегда"""
+        response = self.client.get('/static/img/logo.png')
+        self.assertNotIn('immutable', response.get('Cache-Control', ''))
@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import metrics
+from core.models import Task
+from core.tasks import claim_tasks, run_task, task
+
+CALLS = []
+
+
+@task
+def remember(value):
+    CALLS.append(value)
+
+
+@task(priority=5, max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        cache.clear()
+
+    def test_delay_enqueues_task(self):
+        """delay() кладёт вызов в очередь, а не выполняет его"""
+        remember.delay('a')
+        self.assertEqual(CALLS, [])
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'core.tests.test_tasks.remember')
+        self.assertEqual(task.status, Task.QUEUED)
+
+    def test_key_deduplicates_pending_tasks(self):
+        """Пока задача с ключом в очереди, вторая такая же не ставится"""
+        first = remember.enqueue(('a',), key='remember:a')
+        self.assertIsNone(remember.enqueue(('a',), key='remember:a'))
+        self.assertEqual(Task.objects.count(), 1)
+        claim_tasks(1, 'test')
+        run_task(first.pk)
+        self.assertIsNotNone(remember.enqueue(('a',), key='remember:a'))
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_immediately(self):
+        """В режиме TASKS_EAGER задача выполняется сразу"""
+        remember.delay('a')
+        self.assertEqual(CALLS, ['a'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_claim_prefers_priority(self):
+        """Первыми забираются задачи с большим приоритетом"""
+        low = remember.delay('low')
+        high = remember.enqueue(('high',), priority=10)
+        self.assertEqual(claim_tasks(1, 'test'), [high.pk])
+        self.assertEqual(claim_tasks(5, 'test'), [low.pk])
+        self.assertEqual(claim_tasks(5, 'test'), [])
+
+    def test_run_task_deletes_and_measures(self):
+        """Выполненная задача удаляется, метрики копятся"""
+        task = remember.delay('a')
+        claim_tasks(1, 'test')
+        self.assertTrue(run_task(task.pk))
+        self.assertEqual(CALLS, ['a'])
+        self.assertFalse(Task.objects.exists())
+        stats = metrics.snapshot()
+        self.assertEqual(stats['tasks.done'], 1)
+        self.assertEqual(stats['tasks.wait.count'], 1)
+
+    def test_failed_task_is_retried_then_failed(self):
+        """Упавшая задача повторяется с задержкой, потом помечается ошибкой"""
+        task = explode.delay()
+        claim_tasks(1, 'test')
+        self.assertFalse(run_task(task.pk))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertEqual(claim_tasks(1, 'test'), [])
+
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        claim_tasks(1, 'test')
+        run_task(task.pk)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertIn('boom', task.error)
+
+
+class RunTasksCommandTests(TransactionTestCase):
+    def test_burst_worker_drains_queue(self):
+        """Воркер в режиме --burst выполняет всё и завершается"""
+        CALLS.clear()
+        for value in range(5):
+            remember.delay(value)
+        call_command('run_tasks', '--burst', '--workers=2',
+                     stdout=StringIO())
+        self.assertEqual(sorted(CALLS), list(range(5)))
+        self.assertFalse(Task.objects.exists())
@@ -0,0 +1,15 @@
+import re
+from urllib.parse import urlsplit
+
+from django.urls import re_path
+
+
+def files_at(prefix, view):
+    """Маршрут к файлам под prefix из настроек, как у static().
+
+    Если prefix указывает на другой хост, файлы отдаёт он, и маршрута нет.
+    """
+    if not prefix or urlsplit(prefix).netloc:
+        return []
+    return [re_path(r'^%s(?P<path>.*)$' % re.escape(prefix.lstrip('/')),
+                    view)]
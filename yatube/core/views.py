@@ -1,4 +1,12 @@
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import Http404
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.static import serve
+
+from .sendfile import sendfile
+from .storage import STATIC_HASH_RE, is_content_addressed
 
 
 def page_not_found(request, exception):
@@ -7,3 +15,52 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def media(request, path):
+    """Пускает к файлам из MEDIA_ROOT, кроме скрытых, и отдаёт их."""
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    response = sendfile(request, path, settings.MEDIA_ROOT)
+    if is_content_addressed(path):
+        patch_cache_control(response, public=True, immutable=True,
+                            max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def accepts_gzip(header):
+    """Разрешает ли Accept-Encoding gzip, с учётом q=0 и «*»."""
+    codings = {}
+    for part in header.split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding.lower()] = quality
+    return codings.get('gzip', codings.get('*', 0)) > 0
+
+
+def static_file(request, path):
+    """Отдаёт собранную статику, сжатую заранее, если клиент это умеет.
+
+    В бою статику из STATIC_ROOT отдаёт фронтовой сервер, а Django —
+    только при SERVE_STATIC.
+    """
+    if not settings.SERVE_STATIC:
+        raise Http404
+    compressed = staticfiles_storage.exists(path + '.gz')
+    gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    # serve() сам ставит Content-Encoding: gzip для файлов .gz.
+    response = serve(request, path + '.gz' if compressed and gzip
+                     else path, document_root=settings.STATIC_ROOT)
+    if compressed:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if STATIC_HASH_RE.search(path):
+        patch_cache_control(response, public=True, immutable=True,
+                            max_age=settings.STATIC_CACHE_MAX_AGE)
+    return response
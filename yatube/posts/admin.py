@@ -1,32 +1,124 @@
+from collections import Counter
+
 from django.contrib import admin
 
-from .models import Post, Group, Comment, Follow
+from core.admin import SoftDeleteAdmin
+from .cache import (ARCHIVE_FEED, INDEX_FEED, SITE_FEED, followers_feed,
+                    follows_feed, group_feed, invalidate_feeds, post_feed,
+                    post_feeds)
+from .deletion import soft_delete_group, soft_delete_post
+from .follows import adjust_counts, drop_follows
+from .models import ArchivedPost, Post, Group, Comment, Follow
+from .stats import move_post, record_post
+from .unread import notify_followers
+
+
+class FeedsAdminMixin:
+    """Правка или удаление из админки сдвигает поколения лент объекта.
+
+    Подкласс задаёт feeds(obj). При правке сбрасываются и ленты, где
+    объект был до неё: комментарий мог уйти к другому посту.
+    """
+
+    def feeds(self, obj):
+        raise NotImplementedError
 
+    def save_model(self, request, obj, form, change):
+        old = (self.model._base_manager.filter(pk=obj.pk).first()
+               if change else None)
+        super().save_model(request, obj, form, change)
+        invalidate_feeds(*self.feeds(obj),
+                         *(self.feeds(old) if old is not None else ()))
 
-class PostAdmin(admin.ModelAdmin):
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_feeds(*self.feeds(obj))
+
+    def delete_queryset(self, request, queryset):
+        feeds = [feed for obj in queryset for feed in self.feeds(obj)]
+        super().delete_queryset(request, queryset)
+        invalidate_feeds(*feeds)
+
+
+class PostAdmin(SoftDeleteAdmin):
+    soft_delete = staticmethod(soft_delete_post)
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        old_group = form.initial.get('group')
+        if change:
+            move_post(old_group, obj.group_id, obj.pub_date)
+        else:
+            record_post(obj.group_id, obj.pub_date)
+            notify_followers(obj)
+        invalidate_feeds(*post_feeds(obj, old_group))
+
+
+class ArchivedPostAdmin(FeedsAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    search_fields = ('text',)
+    empty_value_display = '-пусто-'
+
+    def feeds(self, obj):
+        return [ARCHIVE_FEED, *post_feeds(obj)]
+
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(SoftDeleteAdmin):
+    soft_delete = staticmethod(soft_delete_group)
     list_display = ('pk', 'title', 'description')
     search_fields = ('title',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Название группы выводится в карточке каждого её поста.
+        invalidate_feeds(SITE_FEED, INDEX_FEED, group_feed(obj.pk))
 
-class CommentAdmin(admin.ModelAdmin):
+
+class CommentAdmin(FeedsAdminMixin, admin.ModelAdmin):
     list_display = ('post', 'author', 'text')
     search_fields = ('text',)
 
+    def feeds(self, obj):
+        return [post_feed(obj.post_id)]
+
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('user', 'author')
     search_fields = ('user', )
 
+    def save_model(self, request, obj, form, change):
+        old = (Follow.objects.filter(pk=obj.pk)
+               .values_list('user_id', 'author_id').first()
+               if change else None)
+        super().save_model(request, obj, form, change)
+        following, followers = Counter(), Counter()
+        following[obj.user_id] += 1
+        followers[obj.author_id] += 1
+        feeds = [follows_feed(obj.user_id), followers_feed(obj.author_id)]
+        if old is not None:
+            following[old[0]] -= 1
+            followers[old[1]] -= 1
+            feeds += [follows_feed(old[0]), followers_feed(old[1])]
+        adjust_counts('following', {
+            user_id: delta for user_id, delta in following.items() if delta})
+        adjust_counts('followers', {
+            user_id: delta for user_id, delta in followers.items() if delta})
+        invalidate_feeds(*feeds)
+
+    def delete_model(self, request, obj):
+        drop_follows(Follow.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        drop_follows(queryset)
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
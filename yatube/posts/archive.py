@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import (ARCHIVE_FEED, INDEX_FEED, SITE_FEED, feed_generations,
+                    invalidate_feeds)
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+POST_FIELDS = [field.attname
+               for field in ArchivedPost._meta.concrete_fields]
+COMMENT_FIELDS = [field.attname
+                  for field in ArchivedComment._meta.concrete_fields]
+
+
+def archive_batch(cutoff, batch_size):
+    """Переносит в архив до batch_size постов старше cutoff."""
+    with transaction.atomic():
+        posts = list(Post.objects.filter(pub_date__lt=cutoff)
+                     .order_by('pk').values(*POST_FIELDS)[:batch_size])
+        if not posts:
+            return 0
+        ids = [post['id'] for post in posts]
+        comments = Comment.all_objects.filter(post_id__in=ids).values(
+            *COMMENT_FIELDS)
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(**post) for post in posts)
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(**comment) for comment in comments)
+        Comment.all_objects.filter(post_id__in=ids).delete()
+        Post.objects.filter(pk__in=ids).delete()
+    return len(posts)
+
+
+def archive_posts(days=None, batch_size=500):
+    """Переносит в архив все посты старше days дней, пачками."""
+    days = settings.POST_ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    archived = 0
+    while True:
+        count = archive_batch(cutoff, batch_size)
+        if not count:
+            break
+        archived += count
+    if archived:
+        # Счётчики архива в кэше и ETag страниц сразу устаревают, а
+        # главная лента архив не читает и просто теряет эти посты.
+        invalidate_feeds(ARCHIVE_FEED, INDEX_FEED)
+    return archived
+
+
+def archive_count(queryset, key):
+    """Число архивных постов, кэшированное до следующей архивации.
+
+    Удаление пользователя тоже меняет число, поэтому в ключе оба поколения.
+    """
+    archive, site = feed_generations(ARCHIVE_FEED, SITE_FEED)
+    return cache.get_or_set(f'archive:count:{key}:{archive}:{site}',
+                            queryset.count, settings.POST_ARCHIVE_COUNT_TTL)
+
+
+class HotColdPosts:
+    """Лента автора или группы: сначала свежие посты, потом архив.
+
+    Пока читатель листает страницы из свежей части, в архив никто
+    не ходит; архивные посты всегда старше свежих, поэтому порядок
+    по -pub_date сохраняется на стыке.
+    """
+
+    def __init__(self, hot, cold, key):
+        self.hot = hot
+        self.cold = cold
+        self.key = key
+
+    def hot_count(self):
+        if not hasattr(self, '_hot_count'):
+            self._hot_count = self.hot.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count() + archive_count(self.cold, self.key)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        hot_count = self.hot_count()
+        start, stop = item.start or 0, item.stop
+        if stop is not None and stop <= hot_count:
+            return list(self.hot[start:stop])
+        posts = list(self.hot[start:]) if start < hot_count else []
+        cold_start = max(start - hot_count, 0)
+        cold_stop = None if stop is None else stop - hot_count
+        return posts + list(self.cold[cold_start:cold_stop])
+
+
+# Тот же порядок, что у курсоров фрагментов: страница и продолжение
+# по курсору не расходятся на постах с одинаковой датой.
+ORDERING = ('-pub_date', '-pk')
+
+
+def author_posts(author):
+    return HotColdPosts(author.posts.order_by(*ORDERING),
+                        author.archived_posts.order_by(*ORDERING),
+                        f'author:{author.pk}')
+
+
+def group_posts(group):
+    return HotColdPosts(group.posts.order_by(*ORDERING),
+                        group.archived_posts.order_by(*ORDERING),
+                        f'group:{group.pk}')
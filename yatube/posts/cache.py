@@ -0,0 +1,96 @@
+import hashlib
+
+from django.core.cache import cache
+
+from .unread import unread_count
+
+INDEX_FEED = 'index'
+# Архивация переносит посты из всех лент профилей и групп сразу.
+ARCHIVE_FEED = 'archive'
+# Редкие правки, видные на любых страницах: удаление или переименование
+# пользователя, переименование группы. Это поколение входит в каждый ETag.
+SITE_FEED = 'site'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def post_feed(post_id):
+    return f'post:{post_id}'
+
+
+def follows_feed(user_id):
+    """Подписки читателя: от них зависит кнопка на странице профиля."""
+    return f'follows:{user_id}'
+
+
+def followers_feed(author_id):
+    """Подписчики автора: от них зависят счётчики в его профиле."""
+    return f'followers:{author_id}'
+
+
+def generation_key(feed):
+    # Поколения живут в кэше по умолчанию: сдвиг виден другим процессам,
+    # только если кэш у них общий (см. core.checks).
+    return f'feed:generation:{feed}'
+
+
+def feed_generation(feed):
+    """Номер поколения ленты: входит в ключи её кэша."""
+    return cache.get_or_set(generation_key(feed), 1, None)
+
+
+def feed_generations(*feeds):
+    keys = [generation_key(feed) for feed in feeds]
+    found = cache.get_many(keys)
+    missing = {key: 1 for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def feed_etag(request, *feeds, personal=True, path=None):
+    """ETag страницы: поколения лент, читатель и адрес с параметрами.
+
+    Считается без запросов к базе, кроме загрузки пользователя из сессии.
+    personal=False — для страниц, одинаковых для всех читателей; в
+    личный ETag входит и число непрочитанных из шапки, так что новый
+    пост подписки или mark_read меняют его на всех страницах.
+    path — адрес вместе с теми параметрами, от которых зависит страница,
+    если это не все параметры запроса.
+    """
+    generations = feed_generations(SITE_FEED, *feeds)
+    reader = (f'{request.user.pk}:{unread_count(request.user)}'
+              if personal else '')
+    path = request.get_full_path() if path is None else path
+    source = f'{generations}:{reader}:{path}'
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+def invalidate_feeds(*feeds):
+    """Сдвигает поколения лент, старые ключи кэша просто истекают."""
+    for feed in set(feeds):
+        key = generation_key(feed)
+        if not cache.add(key, 2, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 2, None)
+
+
+def post_feeds(post, *group_ids):
+    """Ленты, в которых виден пост: общая, автора, группы и сам пост.
+
+    group_ids — прежние группы, если пост из них ушёл.
+    """
+    feeds = [INDEX_FEED, author_feed(post.author_id), post_feed(post.pk)]
+    feeds.extend(group_feed(group_id)
+                 for group_id in (post.group_id, *group_ids)
+                 if group_id is not None)
+    return feeds
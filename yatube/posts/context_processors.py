@@ -0,0 +1,12 @@
+from .unread import unread_count
+
+
+def unread(request):
+    """Счётчик непрочитанных постов подписок для шапки.
+
+    Передаётся функцией: шаблон вызывает её, только если выводит
+    значение, поэтому фрагменты и страницы без шапки кэш не трогают.
+    """
+    return {
+        'unread_count': lambda: unread_count(request.user)
+    }
@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from core.auth import forget_user
+from core.deletion import report
+from core.tasks import task
+from .cache import (INDEX_FEED, SITE_FEED, author_feed, group_feed,
+                    invalidate_feeds, post_feeds)
+from .follows import drop_follows
+from .models import (ArchivedComment, ArchivedPost, Comment, DeletedUser,
+                     Follow, Group, Post, User)
+from .stats import refresh_last_post, unrecord_post, unrecord_posts
+
+
+def in_batches(label, pk, step, queryset, action):
+    """Применяет action к queryset пачками, каждая в своей транзакции.
+
+    Короткие транзакции не держат блокировку базы дольше, чем нужно
+    на одну пачку, и между ними успевают пройти запросы читателей.
+    """
+    model = queryset.model
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)
+                   .order_by()[:settings.DELETION_BATCH_SIZE])
+        if not ids:
+            return
+        with transaction.atomic():
+            action(model._base_manager.filter(pk__in=ids))
+        report(label, pk, step, len(ids))
+
+
+def delete_rows(queryset):
+    queryset.delete()
+
+
+def delete_posts(queryset):
+    """Удаляет пачку постов, убирая их из счётчиков групп."""
+    group_ids = unrecord_posts(queryset.filter(is_deleted=False)
+                               if queryset.model is Post else queryset)
+    queryset.delete()
+    refresh_last_post(group_ids)
+
+
+def detach_group(queryset):
+    queryset.update(group=None)
+
+
+@task(priority=-5)
+def purge_post(post_id):
+    label = Post._meta.label_lower
+    in_batches(label, post_id, 'comments',
+               Comment.all_objects.filter(post_id=post_id), delete_rows)
+    Post.all_objects.filter(pk=post_id).delete()
+    report(label, post_id, 'done', 1)
+
+
+@task(priority=-5)
+def purge_group(group_id):
+    label = Group._meta.label_lower
+    # on_delete=SET_NULL: посты остаются, но теряют группу.
+    for model in (Post, ArchivedPost):
+        in_batches(label, group_id, model._meta.model_name,
+                   model.all_objects.filter(group_id=group_id),
+                   detach_group)
+    Group.all_objects.filter(pk=group_id).delete()
+    report(label, group_id, 'done', 1)
+
+
+@task(priority=-5)
+def purge_user(user_id):
+    """Удаляет строки пользователя пачками, каждая в своей транзакции.
+
+    До конца очистки их скрывает DeletedUser, а счётчики групп
+    и подписок поправляются вместе с каждой пачкой.
+    """
+    label = User._meta.label_lower
+    steps = (
+        ('comments', Comment.all_objects.filter(
+            Q(author_id=user_id) | Q(post__author_id=user_id)),
+         delete_rows),
+        ('posts', Post.all_objects.filter(author_id=user_id), delete_posts),
+        ('archived_comments', ArchivedComment.all_objects.filter(
+            Q(author_id=user_id) | Q(post__author_id=user_id)),
+         delete_rows),
+        ('archived_posts', ArchivedPost.all_objects.filter(
+            author_id=user_id), delete_posts),
+        ('follows', Follow.objects.filter(
+            Q(user_id=user_id) | Q(author_id=user_id)), drop_follows),
+    )
+    for step, queryset, action in steps:
+        in_batches(label, user_id, step, queryset, action)
+    User.objects.filter(pk=user_id).delete()
+    report(label, user_id, 'done', 1)
+
+
+def soft_delete_post(post):
+    """Скрывает пост сразу, а строки удаляет фоновая задача."""
+    if Post.objects.filter(pk=post.pk).update(is_deleted=True):
+        unrecord_post(post.group_id, post.pub_date)
+    invalidate_feeds(*post_feeds(post))
+    purge_post.delay(post.pk)
+
+
+def soft_delete_group(group):
+    Group.all_objects.filter(pk=group.pk).update(is_deleted=True)
+    invalidate_feeds(INDEX_FEED, group_feed(group.pk))
+    purge_group.delay(group.pk)
+
+
+def soft_delete_user(user):
+    """Отключает пользователя и сразу скрывает всё, что он написал.
+
+    В запросе меняется только строка пользователя и флаг DeletedUser:
+    его строки, счётчики и подписки разбирает purge_user. Одно поколение
+    SITE_FEED сбрасывает все страницы, где он мог появиться.
+    """
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        DeletedUser.objects.bulk_create([DeletedUser(user_id=user.pk)],
+                                        ignore_conflicts=True)
+    forget_user(user.pk)
+    invalidate_feeds(SITE_FEED, INDEX_FEED, author_feed(user.pk))
+    purge_user.delay(user.pk)
+
+
+SOFT_DELETE = {
+    Post: soft_delete_post,
+    Group: soft_delete_group,
+    User: soft_delete_user,
+}
+
+
+def soft_delete(obj):
+    SOFT_DELETE[type(obj)](obj)
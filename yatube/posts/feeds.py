@@ -0,0 +1,154 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from .cache import (ARCHIVE_FEED, INDEX_FEED, author_feed, feed_etag,
+                    group_feed)
+from .models import Group, Post, User
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self, obj=None):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj=None):
+        return (self.posts(obj).select_related('author', 'group')
+                [:settings.SYNDICATION_ITEMS])
+
+    def item_title(self, item):
+        return item.text[:50]
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.username}'
+
+    def description(self, obj):
+        return f'Новые записи пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+def atom(feed_class):
+    return type(f'Atom{feed_class.__name__}', (feed_class,), {
+        'feed_type': Atom1Feed,
+        'subtitle': feed_class.description,
+    })
+
+
+# Ленты не читают параметры запроса: ?utm=... не плодит ни ETag,
+# ни копии XML в кэше.
+def index_etag(request):
+    return feed_etag(request, INDEX_FEED, personal=False, path=request.path)
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return None
+    return feed_etag(request, group_feed(group_id), ARCHIVE_FEED,
+                     personal=False, path=request.path)
+
+
+def author_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    return feed_etag(request, author_feed(author_id), ARCHIVE_FEED,
+                     personal=False, path=request.path)
+
+
+def cached_feed(feed_class, etag_func):
+    """Вьюха ленты с условным GET и готовым XML в кэше по ETag.
+
+    ETag меняется вместе с поколением ленты, поэтому при правке
+    поста старый XML просто перестаёт запрашиваться.
+    """
+    feed = feed_class()
+
+    def request_etag(request, *args, **kwargs):
+        # condition() и сама вьюха спрашивают ETag по разу.
+        if not hasattr(request, 'feed_etag'):
+            request.feed_etag = etag_func(request, *args, **kwargs)
+        return request.feed_etag
+
+    @condition(etag_func=request_etag)
+    def view(request, *args, **kwargs):
+        etag = request_etag(request, *args, **kwargs)
+        if etag is None:
+            return feed(request, *args, **kwargs)
+        key = f'syndication:{etag}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers:
+                response[header] = value
+            return response
+        response = feed(request, *args, **kwargs)
+        # Вместе с XML запоминаются и заголовки Feed: Content-Type,
+        # Last-Modified.
+        cache.set(key, (response.content, list(response.items())),
+                  settings.SYNDICATION_CACHE_TIMEOUT)
+        return response
+    return view
+
+
+index_rss = cached_feed(LatestPostsFeed, index_etag)
+index_atom = cached_feed(atom(LatestPostsFeed), index_etag)
+group_rss = cached_feed(GroupPostsFeed, group_etag)
+group_atom = cached_feed(atom(GroupPostsFeed), group_etag)
+author_rss = cached_feed(AuthorPostsFeed, author_etag)
+author_atom = cached_feed(atom(AuthorPostsFeed), author_etag)
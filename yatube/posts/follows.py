@@ -0,0 +1,135 @@
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .cache import followers_feed, follows_feed, invalidate_feeds
+from .models import Follow, FollowCounts, User
+
+# SQLite не принимает больше 999 параметров в одном запросе.
+BATCH_SIZE = 500
+
+
+def follow_counts(user):
+    """(подписчики, подписки) пользователя одним чтением по ключу."""
+    counts = FollowCounts.objects.filter(user_id=user.pk).values_list(
+        'followers', 'following').first()
+    return counts or (0, 0)
+
+
+def recount(user_ids):
+    """Пересчитывает счётчики пользователей по таблице Follow."""
+    FollowCounts.objects.bulk_create(
+        [FollowCounts(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True)
+
+    def count_of(field):
+        rows = (Follow.objects.filter(**{field: OuterRef('user_id')})
+                .order_by().values(field).annotate(count=Count('pk'))
+                .values('count'))
+        return Coalesce(Subquery(rows), Value(0))
+
+    FollowCounts.objects.filter(user_id__in=user_ids).update(
+        followers=count_of('author'), following=count_of('user'))
+
+
+def adjust_counts(field, deltas):
+    """Прибавляет к счётчикам field изменения {user_id: delta}.
+
+    Обычно это один UPDATE на каждое значение delta. У кого строки
+    счётчиков ещё нет, тому она создаётся и считается по Follow.
+    """
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        updated = FollowCounts.objects.filter(user_id__in=user_ids).update(
+            **{field: Greatest(F(field) + delta, 0)})
+        if updated < len(user_ids):
+            recount(user_ids)
+
+
+def follow_many(user, usernames):
+    """Подписывает user на авторов из usernames, пачками.
+
+    Уже существующие подписки и подписка на себя молча пропускаются,
+    поэтому повторный или одновременный вызов не падает на
+    unique_pair_user_author. Запросы идут без общей транзакции, чтобы
+    не держать блокировку; разошедшиеся счётчики чинит команда
+    refresh_follow_counts. Возвращает число новых подписок.
+    """
+    usernames = list(dict.fromkeys(usernames))
+    ops = connection.ops
+    qn = ops.quote_name
+    created = 0
+    authors = []
+    for start in range(0, len(usernames), BATCH_SIZE):
+        batch = usernames[start:start + BATCH_SIZE]
+        # Кандидаты для счётчиков: те, на кого user ещё не подписан.
+        candidates = list(User.objects.filter(username__in=batch)
+                          .exclude(pk=user.pk)
+                          .exclude(following__user=user)
+                          .values_list('pk', flat=True))
+        if not candidates:
+            continue
+        # INSERT ... SELECT: удалённые тем временем авторы отпадают,
+        # а конфликт с уникальным ограничением гасит сама база.
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{qn(Follow._meta.db_table)} '
+            f'({qn("user_id")}, {qn("author_id")}) '
+            f'SELECT %s, {qn("id")} FROM {qn(User._meta.db_table)} '
+            f'WHERE {qn("id")} IN '
+            f'({", ".join(["%s"] * len(candidates))}) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user.pk, *candidates])
+            inserted = max(cursor.rowcount, 0)
+        if inserted and inserted == len(candidates):
+            adjust_counts('followers', dict.fromkeys(candidates, 1))
+            adjust_counts('following', {user.pk: inserted})
+        elif inserted:
+            # Часть подписок успел создать параллельный запрос.
+            recount([user.pk, *candidates])
+        created += inserted
+        authors.extend(candidates)
+    if created:
+        invalidate_feeds(follows_feed(user.pk),
+                         *(followers_feed(pk) for pk in authors))
+    return created
+
+
+def follow(user, username):
+    return follow_many(user, [username]) > 0
+
+
+def unfollow(user, username):
+    """Отписывает и уменьшает счётчики обеих сторон."""
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    deleted, _ = Follow.objects.filter(
+        user_id=user.pk, author_id=author_id).delete()
+    if deleted:
+        adjust_counts('followers', {author_id: -1})
+        adjust_counts('following', {user.pk: -1})
+        invalidate_feeds(follows_feed(user.pk), followers_feed(author_id))
+    return deleted > 0
+
+
+def drop_follows(queryset):
+    """Удаляет подписки queryset и поправляет счётчики обеих сторон.
+
+    Сбрасывает и ETag профилей, где видны эти подписки и счётчики.
+    """
+    pairs = list(queryset.values_list('user_id', 'author_id'))
+    queryset.delete()
+    invalidate_feeds(*(follows_feed(user) for user, _ in pairs),
+                     *(followers_feed(author) for _, author in pairs))
+    adjust_counts('following', {
+        user_id: -count
+        for user_id, count in Counter(user for user, _ in pairs).items()})
+    adjust_counts('followers', {
+        user_id: -count
+        for user_id, count in Counter(a for _, a in pairs).items()})
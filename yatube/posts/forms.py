@@ -1,5 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import F
 
+from .images import EMPTY_METADATA, METADATA_FIELDS, ingest_image
 from .models import Post, Comment
 
 
@@ -8,6 +12,57 @@ class PostForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['group'].empty_label = 'Выбор группы'
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if image is False:
+            self.image_metadata = EMPTY_METADATA
+        if not isinstance(image, UploadedFile):
+            return image
+        if image.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError('Слишком большой файл')
+        image, self.image_metadata = ingest_image(image)
+        return image
+
+    def save(self, commit=True):
+        for field, value in getattr(self, 'image_metadata', {}).items():
+            setattr(self.instance, field, value)
+        return super().save(commit)
+
+    def save_changes(self, version=None):
+        """Пишет в базу только изменённые поля одним UPDATE.
+
+        Если передана version и пост с тех пор уже правили, ничего
+        не пишет и возвращает False.
+        """
+        post = self.save(commit=False)
+        names = list(self.changed_data)
+        if not names:
+            return True
+        if 'image' in names:
+            names.extend(METADATA_FIELDS)
+        new_image = 'image' in names and bool(post.image)
+        values = {}
+        for name in names:
+            field = Post._meta.get_field(name)
+            if name == 'image' and new_image:
+                # Имя в хранилище — хэш содержимого, его можно записать
+                # в строку заранее, а сам файл сохранить только после
+                # удачного UPDATE: при конфликте не останется сирот.
+                values[field.attname] = post.image.storage.hashed_name(
+                    field.generate_filename(post, post.image.name),
+                    post.image.file)
+            else:
+                values[field.attname] = field.pre_save(post, add=False)
+        posts = Post.objects.filter(pk=post.pk)
+        if version is not None:
+            posts = posts.filter(version=version)
+        if not posts.update(version=F('version') + 1, **values):
+            return False
+        if new_image:
+            post.image.save(post.image.name, post.image.file, save=False)
+        post.version = (post.version if version is None else version) + 1
+        return True
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
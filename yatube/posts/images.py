@@ -0,0 +1,78 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+METADATA_FIELDS = ('image_width', 'image_height', 'image_size',
+                   'image_format', 'image_color')
+EMPTY_METADATA = dict.fromkeys(METADATA_FIELDS)
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+
+
+def dominant_color(image):
+    """Средний цвет картинки для заглушки до загрузки."""
+    pixel = image.convert('RGB').resize((1, 1), Image.BOX)
+    red, green, blue = pixel.getpixel((0, 0))
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def image_metadata(image, size, image_format):
+    return {
+        'image_width': image.width,
+        'image_height': image.height,
+        'image_size': size,
+        'image_format': image_format,
+        'image_color': dominant_color(image),
+    }
+
+
+def read_image_metadata(file):
+    """Метаданные уже сохранённой картинки."""
+    with file.open('rb'), Image.open(file) as image:
+        return image_metadata(image, file.size, image.format)
+
+
+def ingest_image(upload):
+    """Ужимает картинку, убирает метаданные и перекодирует её.
+
+    Возвращает файл для сохранения и поля метаданных для Post.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    if getattr(image, 'is_animated', False):
+        # Анимацию не перекодируем, чтобы не потерять кадры, поэтому и
+        # ужать её не можем: слишком большую просто не принимаем.
+        max_width, max_height = settings.POST_IMAGE_MAX_SIZE
+        if image.width > max_width or image.height > max_height:
+            raise ValidationError(
+                f'Анимация больше {max_width}×{max_height} пикселей')
+        upload.seek(0)
+        extension = EXTENSIONS.get(image.format, image.format.lower())
+        content = ContentFile(upload.read(), name=f'image.{extension}')
+        return content, image_metadata(image, content.size, image.format)
+
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(settings.POST_IMAGE_MAX_SIZE, Image.LANCZOS)
+    if has_alpha(image):
+        image_format = 'PNG'
+        image = image.convert('RGBA')
+        options = {'optimize': True}
+    else:
+        image_format = 'JPEG'
+        image = image.convert('RGB')
+        options = {'quality': settings.POST_IMAGE_QUALITY,
+                   'optimize': True,
+                   'progressive': True}
+
+    # Без exif/icc_profile/pnginfo в save() метаданные не переносятся.
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    content = ContentFile(buffer.getvalue(),
+                          name=f'image.{EXTENSIONS[image_format]}')
+    return content, image_metadata(image, content.size, image_format)
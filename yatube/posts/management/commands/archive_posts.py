@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_posts
+
+
+class Command(BaseCommand):
+    help = ('Переносит посты старше POST_ARCHIVE_AFTER_DAYS дней '
+            'вместе с комментариями в архивные таблицы')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        archived = archive_posts(options['days'], options['batch_size'])
+        self.stdout.write(f'Перенесено в архив: {archived}')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import METADATA_FIELDS, read_image_metadata
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заполняет размеры, формат и цвет картинок у старых постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = (Post.objects.exclude(image='')
+                 .filter(image_width__isnull=True)
+                 .only('id', 'image')
+                 .order_by('pk'))
+        updated = failed = last_pk = 0
+        # Идём пачками по первичному ключу: в памяти не больше одной
+        # пачки, а обновления не мешают курсору, как при .iterator().
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            ready = []
+            for post in batch:
+                try:
+                    metadata = read_image_metadata(post.image)
+                except (OSError, ValueError) as error:
+                    failed += 1
+                    self.stderr.write(f'Пост {post.pk}: {error}')
+                    continue
+                for field, value in metadata.items():
+                    setattr(post, field, value)
+                ready.append(post)
+            Post.objects.bulk_update(ready, METADATA_FIELDS)
+            updated += len(ready)
+        self.stdout.write(f'Обновлено: {updated}, с ошибками: {failed}')
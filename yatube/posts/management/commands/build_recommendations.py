@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Follow, User
+from posts.recommendations import build_recommendations, graph_size
+
+
+class Command(BaseCommand):
+    help = ('Строит граф подписок в памяти и сохраняет для каждого '
+            'пользователя лучших кандидатов в подписки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int)
+        parser.add_argument('--fanout', type=int)
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--memory-limit', type=int,
+                            default=settings.RECOMMENDATIONS_MEMORY_LIMIT)
+
+    def handle(self, *args, **options):
+        expected = graph_size(User.objects.count(), Follow.objects.count())
+        if expected > options['memory_limit']:
+            raise CommandError(
+                f'Граф займёт около {expected / 2 ** 20:.0f} МБ, '
+                f'больше лимита {options["memory_limit"] / 2 ** 20:.0f} МБ')
+        start = time.perf_counter()
+        users, graph_bytes = build_recommendations(
+            options['top'], options['fanout'], options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'Пользователей с рекомендациями: {users}, '
+                          f'граф {graph_bytes / 2 ** 20:.1f} МБ, '
+                          f'{elapsed:.1f} с')
@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.follows import follow_many
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = ('Подписывает пользователя на список авторов: по имени '
+            'в строке, из файла или со стандартного ввода')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('file', nargs='?', default='-')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Нет пользователя {options["username"]}')
+        if options['file'] == '-':
+            usernames = sys.stdin.read().split()
+        else:
+            with open(options['file'], encoding='utf-8') as file:
+                usernames = file.read().split()
+        created = follow_many(user, usernames)
+        self.stdout.write(f'Новых подписок: {created} из {len(usernames)}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import compact, rebuild
+
+
+class Command(BaseCommand):
+    help = ('Сжимает счета «Популярного»; с --rebuild пересчитывает их '
+            'по свежим комментариям')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild()
+            self.stdout.write(f'Пересчитано постов: {count}')
+        else:
+            removed = compact()
+            self.stdout.write(f'Удалено остывших постов: {removed}')
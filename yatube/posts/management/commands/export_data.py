@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import export_data
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии, '
+            'архив и подписки в JSON Lines (.gz сжимается)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = export_data(options['path'], options['chunk_size'])
+        self.stdout.write(f'Выгружено строк: {count}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import import_data
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_data пачками; после обрыва '
+            'повторный запуск продолжает с контрольной точки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        count = import_data(options['path'], options['batch_size'], log)
+        self.stdout.write(f'Загружено строк: {count}')
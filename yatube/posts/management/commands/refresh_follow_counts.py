@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.follows import BATCH_SIZE, recount
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число подписчиков и подписок всех '
+            'пользователей по таблице подписок')
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.order_by('pk').values_list(
+            'pk', flat=True))
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            recount(user_ids[start:start + BATCH_SIZE])
+        self.stdout.write(f'Пересчитано пользователей: {len(user_ids)}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild_stats, refresh_windows
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает окна активности групп; с --rebuild сверяет '
+            'все счётчики с таблицами постов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rebuild_stats()
+        else:
+            refresh_windows()
+        self.stdout.write('Счётчики групп пересчитаны')
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('post_count', models.PositiveIntegerField(db_index=True, default=0)),
+                ('last_post_at', models.DateTimeField(db_index=True, null=True)),
+                ('posts_24h', models.PositiveIntegerField(db_index=True, default=0)),
+                ('posts_7d', models.PositiveIntegerField(db_index=True, default=0)),
+            ],
+        ),
+    ]
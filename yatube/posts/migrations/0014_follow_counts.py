@@ -0,0 +1,61 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+# SQLite не принимает больше 999 параметров в одном запросе.
+BATCH_SIZE = 500
+
+
+def backfill_counts(apps, schema_editor):
+    """То же, что posts.follows.recount, на исторических моделях."""
+    Follow = apps.get_model('posts', 'Follow')
+    FollowCounts = apps.get_model('posts', 'FollowCounts')
+
+    def count_of(field):
+        rows = (Follow.objects.filter(**{field: OuterRef('user_id')})
+                .order_by().values(field).annotate(count=Count('pk'))
+                .values('count'))
+        return Coalesce(Subquery(rows), Value(0))
+
+    user_ids = sorted(
+        set(Follow.objects.values_list('user_id', flat=True))
+        | set(Follow.objects.values_list('author_id', flat=True)))
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        FollowCounts.objects.bulk_create(
+            [FollowCounts(user_id=user_id) for user_id in batch],
+            ignore_conflicts=True)
+        FollowCounts.objects.filter(user_id__in=batch).update(
+            followers=count_of('author'), following=count_of('user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0013_unread_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowCounts',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_counts', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('following', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'id'], name='follow_author_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user', 'id'], name='follow_user_id_idx'),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
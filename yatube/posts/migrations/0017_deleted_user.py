@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:36
+
+import json
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def hide_pending_users(apps, schema_editor):
+    """Пользователей, ждущих purge_user, раньше прятал is_active.
+
+    Теперь их скрывает строка в DeletedUser; просто отключённые аккаунты
+    остаются видимыми.
+    """
+    Task = apps.get_model('core', 'Task')
+    DeletedUser = apps.get_model('posts', 'DeletedUser')
+    user_ids = {json.loads(payload)['args'][0] for payload in
+                Task.objects.filter(name='posts.deletion.purge_user')
+                .values_list('payload', flat=True)}
+    DeletedUser.objects.bulk_create(
+        [DeletedUser(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0005_deletion'),
+        ('posts', '0016_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedUser',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(hide_pending_users, migrations.RunPython.noop),
+    ]
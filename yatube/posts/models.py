@@ -1,18 +1,81 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import post_image_storage
+
 User = get_user_model()
 
 
+class VisibleManager(models.Manager):
+    """Скрывает строки, помеченные удалёнными.
+
+    Строки убирает фоновая задача из posts.deletion, а до неё они
+    не должны попадать ни в ленты, ни в связанные менеджеры.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class AuthoredManager(models.Manager):
+    """Скрывает строки авторов, ждущих purge_user.
+
+    Флаг стоит один на пользователя (DeletedUser), так что удаление
+    не трогает его строки в запросе админки. Таблица маленькая —
+    в ней только ещё не удалённые пользователи, — и соединять
+    с auth_user не нужно; отключённый аккаунт ничего не прячет.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().exclude(
+            author_id__in=DeletedUser.objects.values('user_id'))
+
+
+class VisiblePostManager(AuthoredManager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class DeletedUser(models.Model):
+    """Пользователь, удалённый через soft_delete_user.
+
+    Строка уходит каскадом вместе с пользователем в конце purge_user.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='+')
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    is_deleted = models.BooleanField(default=False)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.title
 
 
+class GroupStats(models.Model):
+    """Счётчики активности группы для каталога групп.
+
+    Обновляются по одному посту при создании, удалении и смене группы;
+    окна за сутки и неделю пересчитывает задача posts.stats.
+    """
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    post_count = models.PositiveIntegerField(default=0, db_index=True)
+    last_post_at = models.DateTimeField(null=True, db_index=True)
+    posts_24h = models.PositiveIntegerField(default=0, db_index=True)
+    posts_7d = models.PositiveIntegerField(default=0, db_index=True)
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
@@ -31,8 +94,21 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_image_storage,
         blank=True,
     )
+    # Заполняются при загрузке, чтобы шаблонам не читать файл картинки.
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_size = models.PositiveIntegerField(null=True, blank=True)
+    image_format = models.CharField(max_length=10, blank=True, null=True)
+    image_color = models.CharField(max_length=7, blank=True, null=True)
+    is_deleted = models.BooleanField(default=False)
+    # Растёт с каждой правкой: устаревшая форма не затрёт чужие изменения.
+    version = models.PositiveIntegerField(default=1)
+
+    objects = VisiblePostManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ('-pub_date',)
@@ -55,6 +131,9 @@ class Comment(models.Model):
         related_name='comments',
     )
 
+    objects = AuthoredManager()
+    all_objects = models.Manager()
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -72,3 +151,156 @@ class Follow(models.Model):
         constraints = (models.UniqueConstraint(fields=('user', 'author'),
                                                name='unique_pair_user_author'),
                        )
+        # Списки подписчиков и подписок листаются по курсору в порядке
+        # -id; составные индексы дают постоянное время на любой странице.
+        indexes = (models.Index(fields=('author', 'id'),
+                                name='follow_author_id_idx'),
+                   models.Index(fields=('user', 'id'),
+                                name='follow_user_id_idx'))
+
+
+class FollowCounts(models.Model):
+    """Число подписчиков и подписок пользователя.
+
+    Меняется вместе со строками Follow в posts.follows, чтобы профиль
+    не считал подписчиков на каждом запросе.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_counts',
+    )
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+
+
+class Recommendation(models.Model):
+    """Автор, которого стоит предложить пользователю.
+
+    Заполняется пачкой командой build_recommendations; на странице
+    подписок читаются первые строки по индексу (user, -score).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommended_to',
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = (models.UniqueConstraint(
+            fields=('user', 'author'), name='unique_recommendation'),)
+        indexes = (models.Index(fields=('user', '-score'),
+                                name='recommendation_user_score_idx'),)
+
+
+class UnreadCounter(models.Model):
+    """Сколько новых постов избранных авторов пользователь не видел.
+
+    Растёт при публикации поста у всех подписчиков автора и
+    сбрасывается, когда пользователь открывает ленту подписок.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='unread',
+    )
+    count = models.PositiveIntegerField(default=0)
+
+
+class TrendingPost(models.Model):
+    """Затухающий счёт поста для страницы «Популярное».
+
+    Хранится с прямым затуханием: вклад комментария растёт со временем
+    относительно TrendingLandmark, поэтому старые строки не трогают,
+    а сортировка по score сразу даёт текущий порядок.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+    )
+    score = models.FloatField(default=0, db_index=True)
+
+
+class TrendingLandmark(models.Model):
+    """Момент, от которого отсчитаны веса в TrendingPost.score."""
+    moment = models.DateTimeField()
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый из ленты командой archive_posts.
+
+    Ключ тот же, что был у Post, поэтому ссылки на пост не ломаются.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField(db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        storage=post_image_storage,
+        blank=True,
+    )
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_size = models.PositiveIntegerField(null=True, blank=True)
+    image_format = models.CharField(max_length=10, blank=True, null=True)
+    image_color = models.CharField(max_length=7, blank=True, null=True)
+
+    objects = AuthoredManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        ordering = ('-pub_date',)
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    created = models.DateTimeField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+    )
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+    )
+
+    objects = AuthoredManager()
+    all_objects = models.Manager()
+
+
+class ImportCheckpoint(models.Model):
+    """Докуда import_data загрузил файл path."""
+    path = models.CharField(max_length=255, unique=True)
+    state = models.TextField()
+
+    def __str__(self):
+        return self.path
@@ -0,0 +1,150 @@
+import heapq
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, Recommendation, User
+
+
+class Graph:
+    """Граф подписок в массивах (CSR): ребро — одно число int32.
+
+    ids — отсортированные ключи пользователей, вершина — индекс в ids.
+    Соседи вершины i лежат в targets[offsets[i]:offsets[i + 1]], в том
+    порядке, в каком пришли пары: для ленты подписок — новые первыми.
+    """
+
+    def __init__(self, ids, pairs):
+        self.ids = ids
+        self.offsets = array('q', bytes(8 * (len(ids) + 1)))
+        self.targets = array('i')
+        for source, target in pairs:
+            source, target = self.index(source), self.index(target)
+            # Пользователь появился или отключился, пока читались рёбра.
+            if source is None or target is None:
+                continue
+            self.targets.append(target)
+            self.offsets[source + 1] += 1
+        for i in range(len(ids)):
+            self.offsets[i + 1] += self.offsets[i]
+
+    def index(self, user_id):
+        i = bisect_left(self.ids, user_id)
+        if i < len(self.ids) and self.ids[i] == user_id:
+            return i
+        return None
+
+    def neighbours(self, i, limit):
+        start = self.offsets[i]
+        return self.targets[start:min(self.offsets[i + 1], start + limit)]
+
+    @property
+    def nbytes(self):
+        return sum(len(part) * part.itemsize
+                   for part in (self.offsets, self.targets))
+
+
+def graph_size(users, edges):
+    """Сколько байт займут ids и оба графа для такого числа строк."""
+    return users * 8 * 3 + edges * 4 * 2
+
+
+def load_graphs(chunk_size=10000):
+    """Подписки активных пользователей: прямой и обратный граф.
+
+    Рёбра читаются потоком, в памяти держатся только массивы.
+    """
+    ids = array('q', User.objects.filter(is_active=True).order_by('pk')
+                .values_list('pk', flat=True).iterator(chunk_size))
+    edges = Follow.objects.filter(user__is_active=True,
+                                  author__is_active=True)
+    following = Graph(ids, edges.order_by('user_id', '-pk').values_list(
+        'user_id', 'author_id').iterator(chunk_size))
+    followers = Graph(ids, edges.order_by('author_id', '-pk').values_list(
+        'author_id', 'user_id').iterator(chunk_size))
+    return following, followers
+
+
+def candidate_scores(i, following, followers, fanout):
+    """Счёт кандидатов для вершины i.
+
+    Друзья друзей: авторы, на которых подписаны мои авторы (вес 1).
+    Совместные подписки: авторы, на которых подписаны другие читатели
+    моих авторов (вес RECOMMENDATIONS_CO_FOLLOW_WEIGHT). На каждом шаге
+    берётся не больше fanout самых свежих соседей, так что работа и
+    память на пользователя ограничены fanout в кубе.
+    """
+    mine = following.neighbours(i, following.offsets[i + 1])
+    skip = set(mine)
+    skip.add(i)
+    co_weight = settings.RECOMMENDATIONS_CO_FOLLOW_WEIGHT
+    scores = {}
+    for author in mine[:fanout]:
+        for candidate in following.neighbours(author, fanout):
+            if candidate not in skip:
+                scores[candidate] = scores.get(candidate, 0) + 1
+        for reader in followers.neighbours(author, fanout):
+            if reader == i:
+                continue
+            for candidate in following.neighbours(reader, fanout):
+                if candidate not in skip:
+                    scores[candidate] = (scores.get(candidate, 0)
+                                         + co_weight)
+    return scores
+
+
+def save_batch(following, batch):
+    """Заменяет рекомендации пачки пользователей одной транзакцией."""
+    user_ids = [following.ids[i] for i, _ in batch]
+    rows = [Recommendation(user_id=following.ids[i],
+                           author_id=following.ids[candidate], score=score)
+            for i, top in batch for candidate, score in top]
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=user_ids).delete()
+        Recommendation.objects.bulk_create(rows)
+
+
+def build_recommendations(top=None, fanout=None, batch_size=None):
+    """Пересчитывает топ рекомендаций для всех активных пользователей.
+
+    Возвращает (число пользователей с рекомендациями, размер графа
+    в байтах).
+    """
+    top = top or settings.RECOMMENDATIONS_COUNT
+    fanout = fanout or settings.RECOMMENDATIONS_FANOUT
+    batch_size = batch_size or settings.RECOMMENDATIONS_BATCH_SIZE
+    following, followers = load_graphs()
+    batch = []
+    users = 0
+    for i in range(len(following.ids)):
+        # Пустой топ тоже пишется: он стирает устаревшие рекомендации.
+        scores = candidate_scores(i, following, followers, fanout)
+        # Равные счета — в пользу более нового автора.
+        best = heapq.nlargest(top, scores.items(),
+                              key=lambda item: (item[1], item[0]))
+        batch.append((i, best))
+        users += bool(best)
+        if len(batch) >= batch_size:
+            save_batch(following, batch)
+            batch = []
+    if batch:
+        save_batch(following, batch)
+    ids = following.ids
+    return users, (len(ids) * ids.itemsize + following.nbytes
+                   + followers.nbytes)
+
+
+def recommendations_for(user, limit=None):
+    """Рекомендации для страницы подписок одним запросом по индексу.
+
+    Авторы, на которых пользователь подписался после расчёта, и
+    отключённые авторы отсекаются в том же запросе.
+    """
+    limit = limit or settings.RECOMMENDATIONS_SHOWN
+    return [recommendation.author for recommendation in
+            Recommendation.objects.filter(user=user,
+                                          author__is_active=True)
+            .exclude(author__following__user=user)
+            .select_related('author').order_by('-score')[:limit]]
@@ -0,0 +1,191 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Count, DateTimeField, F, Max, OuterRef, Q,
+                              Subquery, Value)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.tasks import release_key, task
+from .models import ArchivedPost, Group, GroupStats, Post
+
+REFRESH_KEY = 'group-stats:refresh'
+WINDOWS = {'posts_24h': timedelta(hours=24), 'posts_7d': timedelta(days=7)}
+
+
+def windows_for(pub_date):
+    """Окна активности, в которые попадает пост с такой датой."""
+    now = timezone.now()
+    return [name for name, size in WINDOWS.items()
+            if pub_date >= now - size]
+
+
+def ensure_stats(group_id):
+    GroupStats.objects.bulk_create([GroupStats(group_id=group_id)],
+                                   ignore_conflicts=True)
+
+
+def record_post(group_id, pub_date):
+    """Учитывает новый пост группы одним UPDATE."""
+    if group_id is None:
+        return
+    ensure_stats(group_id)
+    changes = {name: F(name) + 1 for name in windows_for(pub_date)}
+    date = Value(pub_date, output_field=DateTimeField())
+    GroupStats.objects.filter(group_id=group_id).update(
+        post_count=F('post_count') + 1,
+        last_post_at=Greatest(Coalesce('last_post_at', date), date),
+        **changes,
+    )
+    schedule_refresh()
+
+
+def refresh_last_post(group_ids, since=None):
+    """Пересчитывает last_post_at по видимым постам групп.
+
+    С since трогает только группы, чей последний пост не раньше since:
+    у остальных убранный пост последним не был.
+    """
+    def latest(model):
+        return Subquery(model.objects.filter(group_id=OuterRef('group_id'))
+                        .order_by().values('group_id')
+                        .annotate(last=Max('pub_date')).values('last'))
+
+    stats = GroupStats.objects.filter(group_id__in=group_ids)
+    if since is not None:
+        stats = stats.filter(last_post_at__lte=since)
+    # Архивные посты старше любого живого, поэтому архив нужен, только
+    # если живых не осталось.
+    stats.update(last_post_at=Coalesce(latest(Post), latest(ArchivedPost)))
+
+
+def unrecord_post(group_id, pub_date):
+    """Убирает уже скрытый или перенесённый пост из счётчиков группы."""
+    if group_id is None:
+        return
+    names = ['post_count', *windows_for(pub_date)]
+    GroupStats.objects.filter(group_id=group_id).update(
+        **{name: Greatest(F(name) - 1, 0) for name in names})
+    refresh_last_post([group_id], since=pub_date)
+
+
+def window_counts():
+    """Агрегаты числа постов queryset в каждом окне активности."""
+    now = timezone.now()
+    return {name: Count('pk', filter=Q(pub_date__gte=now - size))
+            for name, size in WINDOWS.items()}
+
+
+def record_posts(posts):
+    """Учитывает все посты queryset, по UPDATE на группу.
+
+    Для загрузки пачками: import_data вызывает её после каждой пачки.
+    """
+    rows = list(posts.filter(group__isnull=False).values('group')
+                .annotate(post_count=Count('pk'), last=Max('pub_date'),
+                          **window_counts())
+                .order_by())
+    for row in rows:
+        group_id = row.pop('group')
+        date = Value(row.pop('last'), output_field=DateTimeField())
+        ensure_stats(group_id)
+        GroupStats.objects.filter(group_id=group_id).update(
+            last_post_at=Greatest(Coalesce('last_post_at', date), date),
+            **{name: F(name) + count for name, count in row.items()
+               if count})
+    if rows:
+        schedule_refresh()
+
+
+def unrecord_posts(posts):
+    """Убирает из счётчиков все посты queryset, по UPDATE на группу.
+
+    Вызывать до того, как посты скрыты; возвращает группы, которым
+    после этого нужен refresh_last_post.
+    """
+    rows = (posts.filter(group__isnull=False).values('group')
+            .annotate(post_count=Count('pk'), **window_counts())
+            .order_by())
+    group_ids = []
+    for row in rows:
+        group_id = row.pop('group')
+        GroupStats.objects.filter(group_id=group_id).update(
+            **{name: Greatest(F(name) - count, 0)
+               for name, count in row.items() if count})
+        group_ids.append(group_id)
+    return group_ids
+
+
+def move_post(old_group_id, new_group_id, pub_date):
+    if old_group_id != new_group_id:
+        unrecord_post(old_group_id, pub_date)
+        record_post(new_group_id, pub_date)
+
+
+def refresh_windows():
+    """Пересчитывает окна за сутки и неделю по свежим постам.
+
+    Читается только последняя неделя постов, а не вся таблица.
+    """
+    now = timezone.now()
+    week_ago = now - WINDOWS['posts_7d']
+    recent = (Post.objects.filter(pub_date__gte=week_ago,
+                                  group__isnull=False)
+              .values('group')
+              .annotate(posts_7d=Count('pk'),
+                        posts_24h=Count('pk', filter=Q(
+                            pub_date__gte=now - WINDOWS['posts_24h'])),
+                        last_post_at=Max('pub_date'))
+              .order_by())
+    # Обнуление и заполнение видны читателям только вместе: иначе
+    # каталог на время пересчёта показал бы пустые окна.
+    with transaction.atomic():
+        GroupStats.objects.filter(posts_7d__gt=0).update(posts_24h=0,
+                                                         posts_7d=0)
+        for row in recent:
+            ensure_stats(row['group'])
+            GroupStats.objects.filter(group_id=row['group']).update(
+                posts_24h=row['posts_24h'],
+                posts_7d=row['posts_7d'],
+                last_post_at=row['last_post_at'],
+            )
+
+
+def rebuild_stats():
+    """Полный пересчёт по таблицам постов, для первого запуска и сверки."""
+    totals = {}
+    for model in (Post, ArchivedPost):
+        rows = (model.objects.filter(group__isnull=False)
+                .values_list('group')
+                .annotate(count=Count('pk'), last=Max('pub_date'))
+                .order_by())
+        for group_id, count, last in rows:
+            total, last_post_at = totals.get(group_id, (0, None))
+            totals[group_id] = (total + count,
+                                max(filter(None, (last_post_at, last))))
+    for group_id in Group.objects.values_list('pk', flat=True):
+        ensure_stats(group_id)
+        post_count, last_post_at = totals.get(group_id, (0, None))
+        GroupStats.objects.filter(group_id=group_id).update(
+            post_count=post_count, last_post_at=last_post_at)
+    refresh_windows()
+
+
+@task(priority=-10)
+def refresh_group_windows():
+    # Ключ снимается до работы: новый пост во время пересчёта
+    # поставит следующий.
+    release_key(REFRESH_KEY)
+    refresh_windows()
+    schedule_refresh()
+
+
+def schedule_refresh():
+    """Держит в очереди одну отложенную задачу пересчёта окон.
+
+    Повтор отсекает ключ задачи в базе, а не кэш: после сброса кэша
+    или упавшей задачи пересчёт не пропадёт и не задвоится.
+    """
+    refresh_group_windows.enqueue(
+        countdown=settings.GROUP_STATS_REFRESH_INTERVAL, key=REFRESH_KEY)
@@ -0,0 +1,49 @@
+from django import template
+
+from ..thumbnails import (MIME_TYPES, cached_variants, image_formats,
+                          prefetch_variants, schedule_thumbnails)
+
+register = template.Library()
+
+
+def srcset(thumbnails):
+    return ', '.join(f'{thumbnail.url} {variant.width}w'
+                     for variant, thumbnail in thumbnails)
+
+
+@register.simple_tag
+def prefetch_pictures(posts):
+    """Заранее находит миниатюры для всех постов страницы."""
+    prefetch_variants(posts)
+    return ''
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """Картинка поста с вариантами под ширину экрана и формат."""
+    if not post.image:
+        return {}
+    if hasattr(post, 'image_variants'):
+        variants = post.image_variants
+    else:
+        variants = cached_variants(post.image)
+    if variants is None:
+        schedule_thumbnails(post.image)
+        return {'src': post.image.url,
+                'width': post.image_width,
+                'height': post.image_height,
+                'color': post.image_color}
+
+    *preferred_formats, fallback_format = image_formats()
+    fallback = variants[fallback_format]
+    _, largest = fallback[-1]
+    return {
+        'sources': [{'type': MIME_TYPES[image_format],
+                     'srcset': srcset(variants[image_format])}
+                    for image_format in preferred_formats],
+        'src': largest.url,
+        'srcset': srcset(fallback),
+        'width': largest.width,
+        'height': largest.height,
+        'color': post.image_color,
+    }
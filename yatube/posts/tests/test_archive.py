@@ -0,0 +1,106 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import ArchivedComment, ArchivedPost, Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(POST_ARCHIVE_AFTER_DAYS=30)
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        now = timezone.now()
+        for i in range(25):
+            post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text=f'Пост {i}')
+            Comment.objects.create(author=cls.user, post=post,
+                                   text=f'Комментарий {i}')
+            # Посты 0-11 старые, 12-24 свежие.
+            age = timedelta(days=100 - i if i < 12 else 25 - i)
+            Post.objects.filter(pk=post.pk).update(pub_date=now - age)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def archive(self):
+        call_command('archive_posts', '--batch-size=3', stdout=StringIO())
+
+    def texts(self, url, page):
+        response = self.client.get(url, {'page': page})
+        return [post.text for post in response.context['page_obj']]
+
+    def test_old_posts_and_comments_move_to_archive(self):
+        """Старые посты и их комментарии переезжают в архив"""
+        old_ids = set(Post.objects.filter(
+            pub_date__lt=timezone.now() - timedelta(days=30)).values_list(
+                'pk', flat=True))
+        self.assertEqual(len(old_ids), 12)
+        self.archive()
+        self.assertEqual(Post.objects.count(), 13)
+        self.assertEqual(set(ArchivedPost.objects.values_list(
+            'pk', flat=True)), old_ids)
+        self.assertEqual(ArchivedComment.objects.count(), 12)
+        self.assertEqual(Comment.objects.count(), 13)
+
+    def test_archiving_changes_index_etag(self):
+        """Архивация сбрасывает ETag и кэш главной ленты"""
+        url = reverse('posts:index') + '?page=3'
+        response = self.client.get(url)
+        self.assertContains(response, 'Пост 0<')
+        self.archive()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Пост 0<')
+
+    def test_profile_falls_through_to_archive(self):
+        """Профиль и группа листаются в архив после свежих постов"""
+        urls = (reverse('posts:profile', args=[self.user.username]),
+                reverse('posts:group_list', args=[self.group.slug]))
+        before = [[self.texts(url, page) for page in (1, 2, 3)]
+                  for url in urls]
+        self.archive()
+        after = [[self.texts(url, page) for page in (1, 2, 3)]
+                 for url in urls]
+        self.assertEqual(after, before)
+        self.assertEqual(after[0][1][2:4], ['Пост 12', 'Пост 11'])
+        self.assertEqual(after[0][2], ['Пост 4', 'Пост 3', 'Пост 2',
+                                       'Пост 1', 'Пост 0'])
+
+        response = self.client.get(urls[0])
+        self.assertEqual(response.context['posts_count'], 25)
+
+    def test_first_page_does_not_read_archive_items(self):
+        """Первая страница не достаёт посты из архива"""
+        self.archive()
+        url = reverse('posts:profile', args=[self.user.username])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        # Число архивных постов уже в кэше, а страница целиком свежая.
+        self.assertFalse([query for query in queries
+                          if 'archived' in query['sql']])
+
+    def test_archived_post_detail(self):
+        """Страница архивного поста открывается по старому id"""
+        post = Post.objects.get(text='Пост 0')
+        self.archive()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['post'].text, 'Пост 0')
+        self.assertContains(response, 'Комментарий 0')
+        self.assertTrue(response.context['archived'])
@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..deletion import soft_delete
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_304(self):
+        """Неизменившиеся страницы отдают 304 без шаблона"""
+        urls = (reverse('posts:index'),
+                reverse('posts:group_list', args=[self.group.slug]),
+                reverse('posts:profile', args=[self.user.username]),
+                reverse('posts:post_detail', args=[self.post.pk]))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.revalidate(self.reader_client, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.content)
+
+    def test_etag_depends_on_page_and_reader(self):
+        """ETag разный для разных страниц и читателей"""
+        url = reverse('posts:index')
+        etag = self.reader_client.get(url)['ETag']
+        self.assertNotEqual(
+            self.reader_client.get(url, {'page': 2})['ETag'], etag)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_new_post_changes_feeds(self):
+        """Новый пост сбрасывает ETag ленты и группы"""
+        url = reverse('posts:group_list', args=[self.group.slug])
+        etag = self.reader_client.get(url)['ETag']
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'Новый пост', 'group': self.group.pk})
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый пост')
+
+    def test_comment_and_follow_change_pages(self):
+        """Комментарий и подписка сбрасывают ETag своих страниц"""
+        detail = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.reader_client.get(detail)['ETag']
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            data={'text': 'Комментарий'})
+        self.assertEqual(self.reader_client.get(
+            detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        profile = reverse('posts:profile', args=[self.user.username])
+        etag = self.reader_client.get(profile)['ETag']
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.user.username]))
+        self.assertEqual(self.reader_client.get(
+            profile, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_post_page_follows_author_feed(self):
+        """Новый пост автора сбрасывает ETag его старых постов"""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.reader_client.get(url)['ETag']
+        self.authorized_client.post(reverse('posts:post_create'),
+                                    data={'text': 'Новый пост'})
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted_user_changes_group_and_commented_posts(self):
+        """Удаление пользователя сбрасывает ETag его групп и обсуждений"""
+        spammer = User.objects.create_user('spammer')
+        Post.objects.create(author=spammer, group=self.group, text='Спам')
+        Comment.objects.create(author=spammer, post=self.post, text='Спам')
+        urls = (reverse('posts:group_list', args=[self.group.slug]),
+                reverse('posts:post_detail', args=[self.post.pk]))
+        etags = [self.reader_client.get(url)['ETag'] for url in urls]
+        soft_delete(spammer)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, 'Спам')
+
+    def test_admin_edits_change_etags(self):
+        """Правки в админке сбрасывают ETag затронутых страниц"""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        admin_client = Client()
+        admin_client.force_login(admin)
+        comment = Comment.objects.create(author=self.reader, post=self.post,
+                                         text='Комментарий')
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        post_url = reverse('posts:post_detail', args=[self.post.pk])
+        etags = [self.reader_client.get(url)['ETag']
+                 for url in (group_url, post_url)]
+
+        admin_client.post(
+            reverse('admin:posts_group_change', args=[self.group.pk]),
+            data={'title': 'Новое название', 'slug': self.group.slug,
+                  'description': 'Описание'})
+        admin_client.post(
+            reverse('admin:posts_comment_delete', args=[comment.pk]),
+            data={'post': 'yes'})
+        self.assertFalse(Comment.objects.exists())
+        response = self.reader_client.get(group_url,
+                                          HTTP_IF_NONE_MATCH=etags[0])
+        self.assertContains(response, 'Новое название')
+        response = self.reader_client.get(post_url,
+                                          HTTP_IF_NONE_MATCH=etags[1])
+        self.assertNotContains(response, 'Комментарий')
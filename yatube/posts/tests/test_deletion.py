@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.deletion import deletion_progress
+from core.models import Task
+from ..deletion import purge_group, purge_user, soft_delete
+from ..follows import follow, follow_counts
+from ..models import (Comment, DeletedUser, Follow, Group, GroupStats,
+                      Post)
+from ..stats import rebuild_stats
+
+User = get_user_model()
+
+
+@override_settings(DELETION_BATCH_SIZE=2)
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.spammer = User.objects.create_user('spammer')
+        self.reader = User.objects.create_user('reader')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        self.posts = [Post.objects.create(author=self.spammer,
+                                          group=self.group, text=f'Спам {i}')
+                      for i in range(5)]
+        self.reader_post = Post.objects.create(
+            author=self.reader, group=self.group, text='Обычный пост')
+        for post in self.posts[:3]:
+            Comment.objects.create(author=self.reader, post=post,
+                                   text='Ответ')
+        Comment.objects.create(author=self.spammer, post=self.reader_post,
+                               text='Спам в комментарии')
+        follow(self.reader, 'spammer')
+
+    def test_user_is_hidden_then_purged_in_batches(self):
+        """Пользователь скрывается сразу, строки удаляются пачками"""
+        soft_delete(self.spammer)
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+        self.assertFalse(self.reader_post.comments.exists())
+        self.assertEqual(Task.objects.get().name,
+                         'posts.deletion.purge_user')
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Спам')
+
+        purge_user(self.spammer.pk)
+        self.assertFalse(User.objects.filter(pk=self.spammer.pk).exists())
+        self.assertEqual(Post.all_objects.count(), 1)
+        self.assertEqual(Comment.all_objects.count(), 0)
+        self.assertFalse(Follow.objects.exists())
+        progress = deletion_progress(self.spammer)
+        self.assertEqual(progress['step'], 'done')
+        self.assertEqual(progress['deleted'], 4 + 5 + 1 + 1)
+
+    def test_request_only_flags_user(self):
+        """В запросе меняется только пользователь, остальное — в purge_user"""
+        rebuild_stats()
+        with CaptureQueriesContext(connection) as queries:
+            soft_delete(self.spammer)
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        for table in ('posts_post', 'posts_comment', 'posts_follow',
+                      'posts_groupstats'):
+            self.assertNotIn(f'"{table}"', sql)
+        self.assertEqual(follow_counts(self.reader), (0, 1))
+
+        purge_user(self.spammer.pk)
+        stats = GroupStats.objects.get(group=self.group)
+        self.assertEqual((stats.post_count, stats.posts_24h), (1, 1))
+        self.assertEqual(stats.last_post_at, self.reader_post.pub_date)
+        self.assertEqual(follow_counts(self.reader), (0, 0))
+
+    def test_deactivated_user_keeps_content(self):
+        """Отключённый, но не удалённый аккаунт ничего не скрывает"""
+        User.objects.filter(pk=self.spammer.pk).update(is_active=False)
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertTrue(self.reader_post.comments.exists())
+
+    def test_group_is_hidden_then_detached(self):
+        """Группа скрывается сразу, посты остаются без группы"""
+        soft_delete(self.group)
+        response = self.client.get(
+            reverse('posts:group_list', args=[self.group.slug]))
+        self.assertEqual(response.status_code, 404)
+
+        purge_group(self.group.pk)
+        self.assertFalse(Group.all_objects.exists())
+        self.assertEqual(Post.objects.filter(group=None).count(), 6)
+
+    def test_admin_delete_is_soft(self):
+        """Удаление из админки не запускает каскад в запросе"""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:auth_user_delete', args=[self.spammer.pk])
+        self.assertEqual(client.get(url).status_code, 200)
+        client.post(url, data={'post': 'yes'})
+        self.spammer.refresh_from_db()
+        self.assertFalse(self.spammer.is_active)
+        self.assertEqual(Post.all_objects.count(), 6)
+        self.assertTrue(DeletedUser.objects.filter(user=self.spammer).exists())
+        response = client.get(reverse('admin:auth_user_changelist'))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        for i in range(3):
+            Post.objects.create(author=cls.user, group=cls.group,
+                                text=f'Пост {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feeds_list_posts(self):
+        """RSS и Atom для сайта, группы и автора"""
+        urls = {
+            reverse('posts:index_rss'): 'application/rss+xml',
+            reverse('posts:index_atom'): 'application/atom+xml',
+            reverse('posts:group_rss', args=['group']): 'application/rss',
+            reverse('posts:group_atom', args=['group']): 'application/atom',
+            reverse('posts:profile_rss',
+                    args=['Random_user']): 'application/rss',
+            reverse('posts:profile_atom',
+                    args=['Random_user']): 'application/atom',
+        }
+        for url, content_type in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(
+                    response['Content-Type'].startswith(content_type))
+                self.assertContains(response, 'Пост 2')
+        self.assertEqual(self.client.get(
+            reverse('posts:group_rss', args=['nope'])).status_code, 404)
+
+    def test_feed_is_cached_and_revalidated(self):
+        """Повторный опрос — из кэша или 304, правка сбрасывает кэш"""
+        url = reverse('posts:group_atom', args=['group'])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'Пост 2')
+        self.assertEqual(self.client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'Свежий пост', 'group': self.group.pk})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежий пост')
+
+    def test_feed_items_query_count(self):
+        """Авторы и группы подтягиваются одним запросом"""
+        with self.assertNumQueries(1):
+            self.client.get(reverse('posts:index_rss'))
+
+    def test_cached_feed_keeps_headers_and_ignores_query(self):
+        """Из кэша лента приходит с заголовками, параметры её не дробят"""
+        url = reverse('posts:index_rss')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'utm_source': 'reader'})
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response['Last-Modified'], first['Last-Modified'])
+        self.assertEqual(response['Content-Type'], first['Content-Type'])
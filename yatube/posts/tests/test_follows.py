@@ -0,0 +1,176 @@
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import (TestCase, TransactionTestCase, Client,
+                         override_settings)
+from django.urls import reverse
+
+from ..follows import follow, follow_counts, follow_many, unfollow
+from ..deletion import purge_user, soft_delete
+from ..models import Follow, FollowCounts
+
+User = get_user_model()
+
+
+class FollowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.authors = [User.objects.create_user(f'author{i}')
+                       for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_follow_is_idempotent_and_counted(self):
+        """Подписка меняет счётчики, повтор — один запрос без записи"""
+        self.assertTrue(follow(self.user, 'author0'))
+        for _ in range(3):
+            with self.assertNumQueries(1):
+                self.assertFalse(follow(self.user, 'author0'))
+        self.assertEqual(self.user.follower.count(), 1)
+        self.assertEqual(follow_counts(self.user), (0, 1))
+        self.assertEqual(follow_counts(self.authors[0]), (1, 0))
+        with self.assertNumQueries(1):
+            self.assertFalse(follow(self.user, 'nobody'))
+        self.assertFalse(follow(self.user, self.user.username))
+
+    def test_unfollow_updates_counts(self):
+        """Отписка: поиск автора, DELETE и два UPDATE счётчиков"""
+        follow(self.user, 'author0')
+        with self.assertNumQueries(4):
+            self.assertTrue(unfollow(self.user, 'author0'))
+        self.assertFalse(self.user.follower.exists())
+        self.assertEqual(follow_counts(self.user), (0, 0))
+        self.assertEqual(follow_counts(self.authors[0]), (0, 0))
+
+    def test_admin_keeps_counts(self):
+        """Подписки, созданные и удалённые в админке, меняют счётчики"""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        client.post(reverse('admin:posts_follow_add'),
+                    data={'user': self.user.pk, 'author': self.authors[0].pk})
+        self.assertEqual(follow_counts(self.user), (0, 1))
+        self.assertEqual(follow_counts(self.authors[0]), (1, 0))
+        pk = Follow.objects.get().pk
+        client.post(reverse('admin:posts_follow_change', args=[pk]),
+                    data={'user': self.user.pk, 'author': self.authors[1].pk})
+        self.assertEqual(follow_counts(self.authors[0]), (0, 0))
+        self.assertEqual(follow_counts(self.authors[1]), (1, 0))
+        client.post(reverse('admin:posts_follow_delete', args=[pk]),
+                    data={'post': 'yes'})
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(follow_counts(self.user), (0, 0))
+        self.assertEqual(follow_counts(self.authors[1]), (0, 0))
+
+    def test_follow_many_skips_existing(self):
+        """Пачка подписок пропускает уже существующие и себя"""
+        follow(self.user, 'author0')
+        created = follow_many(self.user, [
+            'author0', 'author1', 'author1', 'nobody', 'Random_user',
+            'author2'])
+        self.assertEqual(created, 2)
+        self.assertEqual(self.user.follower.count(), 3)
+        self.assertEqual(follow_counts(self.user), (0, 3))
+
+    def test_bulk_follow_endpoint_and_command(self):
+        """Массовая подписка через форму и через команду"""
+        self.authorized_client.post(reverse('posts:follow_bulk'),
+                                    data={'usernames': 'author0, author1'})
+        self.assertEqual(self.user.follower.count(), 2)
+        with tempfile.NamedTemporaryFile('w') as file:
+            file.write('author1\nauthor2\nauthor3\n')
+            file.flush()
+            call_command('bulk_follow', 'Random_user', file.name,
+                         stdout=StringIO())
+        self.assertEqual(self.user.follower.count(), 4)
+
+
+class FollowListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.fans = [User.objects.create_user(f'fan{i}') for i in range(5)]
+        for fan in cls.fans:
+            follow(fan, 'author')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(FOLLOW_LIST_PAGE_SIZE=2)
+    def test_followers_are_paged_by_cursor(self):
+        """Подписчики листаются по курсору, новые первыми"""
+        url = reverse('posts:followers', args=['author'])
+        seen = []
+        cursor = ''
+        while True:
+            # Автор, страница подписок с JOIN на пользователей, счётчики.
+            with self.assertNumQueries(3):
+                response = self.client.get(url, {'cursor': cursor} if cursor
+                                           else {})
+            seen.extend(response.context['people'])
+            cursor = response.context['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, self.fans[::-1])
+        self.assertEqual(response.context['followers_count'], 5)
+
+    def test_following_and_profile_counts(self):
+        """Подписки пользователя и счётчики в профиле"""
+        response = self.client.get(
+            reverse('posts:following', args=['fan0']))
+        self.assertEqual(response.context['people'], [self.author])
+        response = self.client.get(reverse('posts:profile', args=['author']))
+        self.assertContains(response, 'Подписчики: 5')
+        self.assertContains(response, 'Подписки: 0')
+
+    def test_bad_cursor_and_deleted_users(self):
+        """Неверный курсор — 400, удалённый подписчик уходит из списка"""
+        url = reverse('posts:followers', args=['author'])
+        self.assertEqual(self.client.get(url, {'cursor': '!'}).status_code,
+                         400)
+        profile = reverse('posts:profile', args=['author'])
+        etag = self.client.get(profile)['ETag']
+        soft_delete(self.fans[0])
+        purge_user(self.fans[0].pk)
+        response = self.client.get(url)
+        self.assertNotIn(self.fans[0], response.context['people'])
+        self.assertEqual(response.context['followers_count'], 4)
+        response = self.client.get(profile, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Подписчики: 4')
+
+    def test_purge_and_refresh_keep_counts_right(self):
+        """Удаление подписчика и полный пересчёт сохраняют счётчики"""
+        purge_user(self.fans[0].pk)
+        self.assertEqual(follow_counts(self.author), (4, 0))
+        FollowCounts.objects.all().delete()
+        call_command('refresh_follow_counts', stdout=StringIO())
+        self.assertEqual(follow_counts(self.author), (4, 0))
+        self.assertEqual(follow_counts(self.fans[1]), (0, 1))
+
+
+class ConcurrentFollowTests(TransactionTestCase):
+    def test_concurrent_follows_create_one_row(self):
+        """Одновременные подписки не падают на уникальном ограничении"""
+        user = User.objects.create_user('Random_user')
+        User.objects.create_user('author')
+
+        def hammer(_):
+            try:
+                return follow(user, 'author')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(hammer, range(32)))
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(follow_counts(user), (0, 1))
@@ -6,10 +6,16 @@ from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from ..cache import feed_generation, group_feed
 from ..models import Post, Group
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+GIF = (b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21'
+       b'\xf9\x04\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00'
+       b'\x01\x00\x00\x02\x02\x4c\x01\x00\x3b')
 User = get_user_model()
 
 
@@ -60,7 +66,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(post.image, 'posts/image.gif')
+        self.assertRegex(post.image.name, r'^posts/[0-9a-f]{64}\.png$')
 
     def test_edit_post(self):
         pk = self.post.pk
@@ -120,3 +126,89 @@ class PostCreateFormTests(TestCase):
             response, f'''{reverse("users:login")}?next={
             reverse("posts:add_comment",
                     kwargs={"post_id": self.post.pk})}''')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostEditFormTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.groups = [Group.objects.create(title=f'Группа {i}',
+                                           slug=f'group{i}')
+                      for i in range(3)]
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.post = Post.objects.create(author=self.user, text='Пост',
+                                        group=self.groups[0])
+        self.url = reverse('posts:post_edit',
+                           kwargs={'post_id': self.post.pk})
+
+    def edit(self, **data):
+        data.setdefault('text', self.post.text)
+        data.setdefault('group', self.post.group_id)
+        return self.authorized_client.post(self.url, data=data)
+
+    def test_only_changed_fields_are_written(self):
+        """В UPDATE попадают только изменённые поля и версия"""
+        with CaptureQueriesContext(connection) as queries:
+            self.edit(text='Новый текст', version=1)
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE "posts_post"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"text"', updates[0])
+        self.assertNotIn('"group_id"', updates[0])
+        self.assertNotIn('"image"', updates[0])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.text, self.post.version),
+                         ('Новый текст', 2))
+
+    def test_stale_version_is_rejected(self):
+        """Правка по устаревшей версии не затирает чужие изменения"""
+        self.edit(text='Первая правка', version=1)
+        response = self.edit(text='Вторая правка', version=1)
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.context['form'].non_field_errors())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Первая правка')
+
+    def test_conflict_refreshes_version_and_drops_upload(self):
+        """После 409 форма несёт свежую версию, картинка не остаётся"""
+        self.edit(text='Первая правка', version=1)
+        image = SimpleUploadedFile('conflict.gif', GIF, 'image/gif')
+        response = self.edit(text='Вторая правка', image=image, version=1)
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'name="version" value="2"',
+                            status_code=409)
+        storage = Post.image.field.storage
+        self.assertFalse(storage.exists('posts')
+                         and storage.listdir('posts')[1])
+
+    def test_new_image_is_stored_under_written_name(self):
+        """Картинка сохраняется под тем именем, что попало в строку"""
+        image = SimpleUploadedFile('new.gif', GIF, 'image/gif')
+        self.edit(image=image, version=1)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.image.storage.exists(self.post.image.name))
+
+    def test_edit_form_carries_version(self):
+        """Форма правки передаёт текущую версию поста"""
+        response = self.authorized_client.get(self.url)
+        self.assertContains(response, 'name="version" value="1"')
+
+    def test_group_change_invalidates_both_groups(self):
+        """Смена группы сбрасывает кэш старой и новой группы"""
+        before = [feed_generation(group_feed(group.pk))
+                  for group in self.groups]
+        self.edit(group=self.groups[1].pk, version=1)
+        after = [feed_generation(group_feed(group.pk))
+                 for group in self.groups]
+        self.assertNotEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+        self.assertEqual(after[2], before[2])
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for i in range(13):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {i}')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def walk(self, url):
+        texts, cursor = [], None
+        while True:
+            response = self.authorized_client.get(
+                url, {'cursor': cursor} if cursor else {})
+            self.assertNotContains(response, '<html')
+            texts.extend(post.text for post in response.context['page_obj'])
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                return texts
+
+    def test_fragments_walk_every_feed(self):
+        """Фрагменты отдают только статьи и идут по курсору"""
+        expected = [f'Пост {i}' for i in range(12, -1, -1)]
+        urls = (reverse('posts:index_fragment'),
+                reverse('posts:group_fragment', args=['group']),
+                reverse('posts:profile_fragment', args=['author']),
+                reverse('posts:follow_fragment'))
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(url), expected)
+
+    def test_first_fragment_has_next_link(self):
+        """Первая пачка ссылается на следующую"""
+        response = self.client.get(reverse('posts:index_fragment'))
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertIn('rel="next"', response['Link'])
+
+    def test_full_pages_continue_by_cursor(self):
+        """Полная страница отдаёт курсор, и фрагменты продолжают её"""
+        expected = [f'Пост {i}' for i in range(12, -1, -1)]
+        pages = (
+            (reverse('posts:index'), reverse('posts:index_fragment')),
+            (reverse('posts:group_list', args=['group']),
+             reverse('posts:group_fragment', args=['group'])),
+            (reverse('posts:profile', args=['author']),
+             reverse('posts:profile_fragment', args=['author'])),
+            (reverse('posts:follow_index'),
+             reverse('posts:follow_fragment')),
+        )
+        for url, fragment_url in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                cursor = response['X-Next-Cursor']
+                self.assertContains(response, f'data-next-cursor="{cursor}"')
+                self.assertContains(
+                    response, f'href="{fragment_url}?cursor={cursor}"')
+                texts = [post.text for post in response.context['page_obj']]
+                response = self.authorized_client.get(fragment_url,
+                                                      {'cursor': cursor})
+                texts.extend(post.text
+                             for post in response.context['page_obj'])
+                self.assertEqual(texts, expected)
+
+    def test_bad_cursor(self):
+        """Испорченный курсор — 400"""
+        response = self.client.get(reverse('posts:index_fragment'),
+                                   {'cursor': '!!!'})
+        self.assertEqual(response.status_code, 400)
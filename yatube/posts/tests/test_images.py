@@ -0,0 +1,131 @@
+import tempfile
+import shutil
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+def make_animation(size, image_format):
+    buffer = BytesIO()
+    frames = [Image.new('RGB', size, color) for color in ('red', 'blue')]
+    frames[0].save(buffer, image_format, save_all=True,
+                   append_images=frames[1:], duration=100)
+    return buffer.getvalue()
+
+
+def make_jpeg(size, exif=None):
+    buffer = BytesIO()
+    options = {'exif': exif} if exif else {}
+    Image.new('RGB', size, (200, 10, 10)).save(buffer, 'JPEG', **options)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   POST_IMAGE_MAX_SIZE=(100, 100))
+class ImageIngestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('Random_user')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, content):
+        image = SimpleUploadedFile('photo.jpg', content, 'image/jpeg')
+        self.authorized_client.post(reverse('posts:post_create'),
+                                    data={'text': 'Пост', 'image': image})
+        return Post.objects.first()
+
+    def test_image_is_bounded_and_stripped(self):
+        """Картинка ужимается до лимита и теряет EXIF"""
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera'
+        post = self.create_post(make_jpeg((400, 200), exif=exif.tobytes()))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertNotIn('exif', image.info)
+
+    def test_metadata_is_stored_on_upload(self):
+        """Размеры, формат и цвет сохраняются при загрузке"""
+        post = self.create_post(make_jpeg((400, 200)))
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        self.assertEqual(post.image_format, 'JPEG')
+        self.assertEqual(post.image_size, post.image.size)
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertContains(response, 'width="100" height="50"')
+        self.assertContains(response, f'background-color: {post.image_color}')
+
+    def test_backfill_image_metadata(self):
+        """Команда заполняет метаданные у старых постов"""
+        post = Post.objects.create(
+            author=self.user, text='Пост',
+            image=SimpleUploadedFile('old.jpg', make_jpeg((30, 20))))
+        broken = Post.objects.create(author=self.user, text='Пост',
+                                     image='posts/missing.jpg')
+        call_command('backfill_image_metadata', stdout=StringIO(),
+                     stderr=StringIO())
+        post.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (30, 20))
+        self.assertEqual(post.image_format, 'JPEG')
+        self.assertIsNone(broken.image_width)
+
+    def test_identical_images_are_stored_once(self):
+        """Одинаковые картинки хранятся в одном файле"""
+        content = make_jpeg((50, 50))
+        first = self.create_post(content)
+        second = self.create_post(content)
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_too_large_upload_is_rejected(self):
+        """Слишком большой файл не проходит валидацию"""
+        post_count = Post.objects.count()
+        with self.settings(POST_IMAGE_MAX_UPLOAD_SIZE=10):
+            response = self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'Пост', 'image': SimpleUploadedFile(
+                    'photo.jpg', make_jpeg((50, 50)), 'image/jpeg')})
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertTrue(response.context['form'].errors['image'])
+
+    def test_animation_keeps_its_format(self):
+        """Анимированный PNG сохраняется как PNG, а не GIF"""
+        post = self.create_post(make_animation((50, 50), 'PNG'))
+        self.assertTrue(post.image.name.endswith('.png'))
+        self.assertEqual(post.image_format, 'PNG')
+
+    def test_oversized_animation_is_rejected(self):
+        """Анимация больше лимита не принимается"""
+        post_count = Post.objects.count()
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост', 'image': SimpleUploadedFile(
+                'anim.gif', make_animation((200, 50), 'GIF'), 'image/gif')})
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertTrue(response.context['form'].errors['image'])
+
+    def test_media_is_served_immutable(self):
+        """Файлы с именем из хэша отдаются с вечным кэшем"""
+        post = self.create_post(make_jpeg((50, 50)))
+        response = self.authorized_client.get(post.image.url)
+        self.assertIn('immutable', response['Cache-Control'])
@@ -0,0 +1,79 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..follows import follow
+from ..models import Recommendation
+from ..recommendations import build_recommendations, recommendations_for
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {name: User.objects.create_user(name)
+                     for name in ('reader', 'writer', 'friend', 'fan',
+                                  'cofollowed', 'stranger')}
+        # reader -> writer -> friend: друг друга.
+        # fan -> writer, fan -> cofollowed: совместная подписка.
+        for user, author in (('reader', 'writer'), ('writer', 'friend'),
+                             ('fan', 'writer'), ('fan', 'cofollowed'),
+                             ('fan', 'friend')):
+            follow(cls.users[user], author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.users['reader'])
+
+    def names(self, user):
+        return [author.username for author in recommendations_for(user)]
+
+    def test_scores_friends_of_friends_and_co_follows(self):
+        """Друзья друзей весят больше совместных подписок"""
+        build_recommendations()
+        self.assertEqual(self.names(self.users['reader']),
+                         ['friend', 'cofollowed'])
+        scores = dict(Recommendation.objects.filter(
+            user=self.users['reader']).values_list('author__username',
+                                                   'score'))
+        self.assertEqual(scores, {'friend': 1.5, 'cofollowed': 0.5})
+
+    def test_top_k_and_rebuild_replaces_rows(self):
+        """Хранится только топ, повторный расчёт заменяет строки"""
+        build_recommendations(top=1)
+        self.assertEqual(self.names(self.users['reader']), ['friend'])
+        follow(self.users['reader'], 'friend')
+        build_recommendations(top=1)
+        self.assertEqual(self.names(self.users['reader']), ['cofollowed'])
+
+    def test_followed_and_inactive_authors_are_hidden(self):
+        """Уже подписанные и отключённые авторы не показываются"""
+        build_recommendations()
+        follow(self.users['reader'], 'friend')
+        User.objects.filter(username='cofollowed').update(is_active=False)
+        self.assertEqual(self.names(self.users['reader']), [])
+
+    def test_block_on_follow_page(self):
+        """Блок на странице подписок читается одним запросом"""
+        build_recommendations()
+        with self.assertNumQueries(1):
+            recommendations_for(self.users['reader'])
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Кого почитать')
+        self.assertContains(
+            response, reverse('posts:profile_follow', args=['cofollowed']))
+
+    def test_command_respects_memory_limit(self):
+        """Команда отказывается строить граф больше лимита памяти"""
+        with self.assertRaises(CommandError):
+            call_command('build_recommendations', memory_limit=10,
+                         stdout=StringIO())
+        call_command('build_recommendations', stdout=StringIO())
+        self.assertTrue(Recommendation.objects.exists())
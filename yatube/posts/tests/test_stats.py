@@ -0,0 +1,106 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Task
+from ..deletion import soft_delete
+from ..models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.quiet = Group.objects.create(title='Тихая', slug='quiet')
+        cls.busy = Group.objects.create(title='Шумная', slug='busy')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create(self, group, count=1):
+        for i in range(count):
+            self.authorized_client.post(reverse('posts:post_create'), data={
+                'text': f'Пост {i}', 'group': group.pk})
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_counters_follow_create_regroup_and_delete(self):
+        """Счётчики меняются при создании, смене группы и удалении"""
+        self.create(self.busy, 3)
+        stats = self.stats(self.busy)
+        self.assertEqual((stats.post_count, stats.posts_24h, stats.posts_7d),
+                         (3, 3, 3))
+        self.assertIsNotNone(stats.last_post_at)
+
+        post = Post.objects.filter(group=self.busy).first()
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={'text': post.text, 'group': self.quiet.pk})
+        self.assertEqual(self.stats(self.busy).post_count, 2)
+        self.assertEqual(self.stats(self.quiet).post_count, 1)
+
+        post.refresh_from_db()
+        soft_delete(post)
+        self.assertEqual(self.stats(self.quiet).post_count, 0)
+        self.assertEqual(self.stats(self.quiet).posts_24h, 0)
+        self.assertIsNone(self.stats(self.quiet).last_post_at)
+
+    def test_deleting_latest_post_rolls_back_last_post_at(self):
+        """После удаления последнего поста last_post_at берётся из прошлого"""
+        self.create(self.busy, 2)
+        older, latest = Post.objects.filter(group=self.busy).order_by(
+            'pub_date')
+        Post.objects.filter(pk=older.pk).update(
+            pub_date=timezone.now() - timedelta(days=1))
+        soft_delete(latest)
+        older.refresh_from_db()
+        self.assertEqual(self.stats(self.busy).last_post_at, older.pub_date)
+
+    def test_directory_sorts_without_counting_posts(self):
+        """Каталог сортируется по готовым счётчикам"""
+        self.create(self.busy, 2)
+        self.create(self.quiet, 1)
+        with self.assertNumQueries(3):
+            # Число групп, страница с JOIN на stats и счётчик
+            # непрочитанных для шапки; сессия и пользователь — из кэша.
+            response = self.authorized_client.get(reverse('posts:groups'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.busy, self.quiet])
+
+    def test_windows_decay_on_refresh(self):
+        """Пересчёт окон убирает посты старше суток и недели"""
+        self.create(self.busy, 2)
+        Post.objects.filter(group=self.busy).update(
+            pub_date=timezone.now() - timedelta(days=2))
+        call_command('refresh_group_stats', stdout=StringIO())
+        stats = self.stats(self.busy)
+        self.assertEqual((stats.post_count, stats.posts_24h, stats.posts_7d),
+                         (2, 0, 2))
+
+    def test_rebuild(self):
+        """Полный пересчёт восстанавливает счётчики с нуля"""
+        Post.objects.create(author=self.user, group=self.quiet, text='Пост')
+        call_command('refresh_group_stats', '--rebuild', stdout=StringIO())
+        self.assertEqual(self.stats(self.quiet).post_count, 1)
+        self.assertEqual(self.stats(self.busy).post_count, 0)
+
+    def test_one_refresh_is_queued(self):
+        """Пересчёт окон стоит в очереди один, даже без кэша"""
+        for group in (self.busy, self.quiet):
+            self.create(group)
+            cache.clear()
+            self.authorized_client.force_login(self.user)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Task.objects.filter(
+            name='posts.stats.refresh_group_windows').count(), 1)
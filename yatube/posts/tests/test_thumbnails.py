@@ -0,0 +1,139 @@
+import tempfile
+import shutil
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from sorl.thumbnail import default, get_thumbnail
+
+from core.models import Task
+from ..models import Post
+from ..thumbnails import (generate_thumbnails, prefetch_variants,
+                          schedule_thumbnails, thumbnail_variants)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+IMG = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('Random_user')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост',
+            image=SimpleUploadedFile('image.gif', IMG, 'image/gif'),
+        )
+
+    def test_miss_returns_original(self):
+        """На промахе тег отдаёт оригинал и не режет картинку"""
+        variant = next(thumbnail_variants())
+        with mock.patch.object(default.engine, 'get_image') as get_image:
+            im = get_thumbnail(self.post.image, variant.geometry,
+                               **variant.options)
+        get_image.assert_not_called()
+        self.assertEqual(im.url, self.post.image.url)
+
+    def test_generated_thumbnail_is_used(self):
+        """После фоновой генерации тег отдаёт миниатюру"""
+        generate_thumbnails(self.post.image.name)
+        with mock.patch.object(default.engine, 'get_image') as get_image:
+            for variant in thumbnail_variants():
+                im = get_thumbnail(self.post.image, variant.geometry,
+                                   **variant.options)
+                self.assertNotEqual(im.url, self.post.image.url)
+                self.assertEqual(im.width, variant.width)
+        get_image.assert_not_called()
+
+    def test_post_picture_markup(self):
+        """Страница поста отдаёт srcset и ленивую загрузку"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.authorized_client.get(url)
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        self.assertNotContains(response, 'srcset=')
+
+        generate_thumbnails(self.post.image.name)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, '960w')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'width="960" height="339"')
+
+    def test_create_schedules_thumbnails(self):
+        """Создание поста с картинкой ставит миниатюры в очередь"""
+        form_data = {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('new.gif', IMG, 'image/gif'),
+        }
+        with mock.patch('posts.views.schedule_thumbnails') as schedule:
+            self.authorized_client.post(reverse('posts:post_create'),
+                                        data=form_data)
+        schedule.assert_called_once()
+
+    def test_pending_image_is_scheduled_once(self):
+        """Картинка, уже ждущая миниатюр, повторно в очередь не встаёт"""
+        Task.objects.all().delete()
+        schedule_thumbnails(self.post.image)
+        with self.assertNumQueries(0):
+            schedule_thumbnails(self.post.image)
+        cache.clear()
+        schedule_thumbnails(self.post.image)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_broken_image_is_not_scheduled_again(self):
+        """Картинку, которую не открыть, больше не ставят в очередь"""
+        name = Post.image.field.storage.save('posts/broken.gif',
+                                             ContentFile(b'not an image'))
+        Task.objects.all().delete()
+        with self.assertLogs('posts.thumbnails', 'WARNING'):
+            generate_thumbnails(name)
+        with self.assertNumQueries(0):
+            schedule_thumbnails(name)
+        self.assertFalse(Task.objects.exists())
+
+    def test_page_variants_are_prefetched_in_one_query(self):
+        """Миниатюры всей страницы ищутся одним запросом"""
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост{i}',
+                image=SimpleUploadedFile(f'{i}.gif', IMG + bytes([i]),
+                                         'image/gif'),
+            ) for i in range(3)
+        ]
+        for post in posts[:-1]:
+            generate_thumbnails(post.image.name)
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            prefetch_variants(posts)
+        for post in posts[:-1]:
+            self.assertEqual(len(post.image_variants['JPEG']),
+                             len(settings.POST_IMAGE_WIDTHS))
+        self.assertIsNone(posts[-1].image_variants)
+        with self.assertNumQueries(0):
+            prefetch_variants(posts)
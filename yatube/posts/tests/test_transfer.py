@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Max
+from django.test import TestCase
+
+from ..follows import follow_counts
+from ..models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                      GroupStats, ImportCheckpoint, Post)
+from ..transfer import MODELS, insert_batch
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'data.jsonl.gz')
+        users = [User.objects.create_user(f'user{i}') for i in range(3)]
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        for i, user in enumerate(users):
+            post = Post.objects.create(author=user, text=f'Пост {i}',
+                                       group=group if i else None)
+            Comment.objects.create(author=users[0], post=post,
+                                   text='Комментарий')
+        Follow.objects.create(user=users[0], author=users[1])
+        Post.objects.filter(pk=post.pk).update(
+            pub_date='2020-01-01T00:00:00Z')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'author__username', 'group__slug', 'pub_date')),
+            'comments': list(Comment.objects.order_by('pk').values_list(
+                'post__text', 'author__username')),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        }
+
+    def clear(self):
+        for model in reversed(MODELS):
+            model.objects.all().delete()
+
+    def test_export_and_import_round_trip(self):
+        """Выгрузка и загрузка сохраняют строки и связи"""
+        call_command('export_data', self.path, '--chunk-size=2',
+                     stdout=StringIO())
+        before = self.snapshot()
+        self.clear()
+        call_command('import_data', self.path, '--batch-size=2',
+                     stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+        Post.objects.create(author=User.objects.first(), text='Новый')
+
+    def test_import_remaps_keys_into_filled_database(self):
+        """В непустой базе ключи сдвигаются, а связи не путаются"""
+        path = self.path[:-3]
+        call_command('export_data', path, stdout=StringIO())
+        with open(path, encoding='utf-8') as file:
+            lines = [json.loads(line) for line in file]
+        for record in lines:
+            fields = record['fields']
+            for key in ('username', 'slug'):
+                if key in fields:
+                    fields[key] += '_copy'
+            natural = record.get('natural', {})
+            for attname, value in natural.items():
+                if value is not None:
+                    natural[attname] = value + '_copy'
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines(json.dumps(record) + '\n' for record in lines)
+
+        call_command('import_data', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(
+            Post.objects.filter(author__username='user1_copy',
+                                group__slug='group_copy').count(), 1)
+        self.assertTrue(Follow.objects.filter(
+            user__username='user0_copy',
+            author__username='user1_copy').exists())
+
+    def test_import_updates_counters(self):
+        """Загрузка поправляет счётчики групп и подписок"""
+        call_command('export_data', self.path, stdout=StringIO())
+        self.clear()
+        GroupStats.objects.all().delete()
+        call_command('import_data', self.path, '--batch-size=2',
+                     stdout=StringIO())
+        stats = GroupStats.objects.get()
+        self.assertEqual((stats.post_count, stats.posts_24h), (2, 1))
+        self.assertEqual(stats.last_post_at,
+                         Post.objects.aggregate(last=Max('pub_date'))['last'])
+        user0, user1 = User.objects.order_by('pk')[:2]
+        self.assertEqual(follow_counts(user0), (0, 1))
+        self.assertEqual(follow_counts(user1), (1, 0))
+
+    def test_import_maps_existing_users_and_groups(self):
+        """Пользователь и группа с тем же именем не дублируются"""
+        call_command('export_data', self.path, stdout=StringIO())
+        Post.all_objects.filter(author__username='user2').delete()
+        User.objects.filter(username='user2').delete()
+        call_command('import_data', self.path, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        user1 = User.objects.get(username='user1')
+        self.assertEqual(user1.posts.count(), 2)
+        self.assertEqual(Post.objects.filter(
+            author__username='user2', group__slug='group').count(), 1)
+
+    def test_import_skips_archived_keys(self):
+        """Новые посты не занимают ключи постов из архива"""
+        call_command('export_data', self.path, stdout=StringIO())
+        call_command('archive_posts', '--days=0', stdout=StringIO())
+        top = ArchivedPost.objects.aggregate(top=Max('pk'))['top']
+        call_command('import_data', self.path, stdout=StringIO())
+        self.assertFalse(Post.objects.filter(pk__lte=top).exists())
+
+    def test_archive_round_trip(self):
+        """Архивные посты и комментарии выгружаются и загружаются"""
+        call_command('archive_posts', '--days=0', stdout=StringIO())
+        before = list(ArchivedComment.objects.order_by('pk').values_list(
+            'pk', 'post_id', 'post__text', 'author__username'))
+        call_command('export_data', self.path, stdout=StringIO())
+        self.clear()
+        call_command('import_data', self.path, stdout=StringIO())
+        self.assertEqual(list(ArchivedComment.objects.order_by('pk')
+                              .values_list('pk', 'post_id', 'post__text',
+                                           'author__username')), before)
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+
+    def test_import_resumes_from_checkpoint(self):
+        """После обрыва загрузка продолжается с последней пачки"""
+        call_command('export_data', self.path, stdout=StringIO())
+        before = self.snapshot()
+        self.clear()
+        calls = []
+
+        def fail_on_posts(model, objs):
+            if model is Post:
+                raise RuntimeError('обрыв')
+            calls.append(model)
+            insert_batch(model, objs)
+
+        with mock.patch('posts.transfer.insert_batch', fail_on_posts):
+            with self.assertRaises(RuntimeError):
+                call_command('import_data', self.path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 0)
+        self.assertEqual(User.objects.count(), 3)
+        # В контрольной точке только номер строки и сдвиги ключей.
+        state = json.loads(ImportCheckpoint.objects.get().state)
+        self.assertEqual(set(state), {'line', 'offsets'})
+
+        call_command('import_data', self.path, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
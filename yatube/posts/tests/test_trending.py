@@ -0,0 +1,97 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Task
+from ..models import Comment, Post, TrendingLandmark, TrendingPost
+from ..trending import bump, compact, trending_posts
+
+User = get_user_model()
+
+HALF_LIFE = timedelta(seconds=settings.TRENDING_HALF_LIFE)
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Random_user')
+        cls.old = Post.objects.create(author=cls.user, text='Старый')
+        cls.new = Post.objects.create(author=cls.user, text='Новый')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_comment_bumps_post(self):
+        """Комментарий поднимает пост в «Популярном»"""
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.old.pk]),
+            data={'text': 'Комментарий'})
+        self.assertEqual(list(trending_posts()), [self.old])
+
+    def test_recent_activity_outranks_older(self):
+        """Два старых комментария весят меньше одного свежего"""
+        now = timezone.now()
+        for _ in range(2):
+            bump(self.old.pk, moment=now - HALF_LIFE * 2)
+        bump(self.new.pk, moment=now)
+        self.assertEqual(list(trending_posts()), [self.new, self.old])
+
+    def test_one_compaction_is_queued(self):
+        """Сжатие стоит в очереди одно, даже без кэша"""
+        for _ in range(3):
+            bump(self.old.pk)
+            cache.clear()
+        self.assertEqual(
+            Task.objects.filter(name='posts.trending.compact_trending')
+            .count(), 1)
+
+    def test_stale_landmark_is_compacted_by_bump(self):
+        """Без сжатия за год комментарий не падает на переполнении"""
+        year_ago = timezone.now() - timedelta(days=365)
+        TrendingLandmark.objects.create(pk=1, moment=year_ago)
+        bump(self.old.pk, moment=year_ago)
+        bump(self.new.pk)
+        self.assertEqual(list(trending_posts()), [self.new])
+        self.assertAlmostEqual(
+            TrendingPost.objects.get(pk=self.new.pk).score, 1)
+
+    def test_compaction_keeps_order_and_drops_cold(self):
+        """Сжатие не меняет порядок и выбрасывает остывшие посты"""
+        now = timezone.now()
+        bump(self.old.pk, moment=now - HALF_LIFE)
+        bump(self.new.pk, moment=now)
+        before = list(trending_posts())
+        compact(now)
+        self.assertEqual(list(trending_posts()), before)
+        self.assertAlmostEqual(
+            TrendingPost.objects.get(pk=self.new.pk).score, 1)
+
+        compact(now + HALF_LIFE * 10)
+        self.assertFalse(TrendingPost.objects.exists())
+
+    def test_page_reads_scores_in_one_query(self):
+        """Страница «Популярное» читает посты одним запросом"""
+        bump(self.old.pk)
+        bump(self.new.pk)
+        with self.assertNumQueries(1):
+            response = Client().get(reverse('posts:trending'))
+        self.assertContains(response, self.old.text)
+        self.assertContains(response, self.new.text)
+
+    def test_rebuild_from_comments(self):
+        """--rebuild восстанавливает счета по комментариям"""
+        Comment.objects.create(post=self.new, author=self.user, text='1')
+        Comment.objects.create(post=self.old, author=self.user, text='2')
+        Comment.objects.filter(post=self.old).update(
+            created=timezone.now() - HALF_LIFE * 20)
+        call_command('compact_trending', '--rebuild', stdout=StringIO())
+        self.assertEqual(list(trending_posts()), [self.new])
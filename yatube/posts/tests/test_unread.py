@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..models import Follow, UnreadCounter
+from ..unread import unread_count
+
+User = get_user_model()
+
+
+@override_settings(TASKS_EAGER=True)
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('Author')
+        cls.reader = User.objects.create_user('Reader')
+        cls.stranger = User.objects.create_user('Stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def publish(self, count=1):
+        for i in range(count):
+            self.author_client.post(reverse('posts:post_create'),
+                                    data={'text': f'Пост {i}'})
+
+    def unread(self, client):
+        response = client.get(reverse('posts:index'))
+        return response.context['unread_count']()
+
+    def test_new_posts_reach_followers_only(self):
+        """Новый пост увеличивает счётчик только у подписчиков"""
+        self.publish(2)
+        self.assertEqual(self.unread(self.reader_client), 2)
+        self.assertFalse(
+            UnreadCounter.objects.filter(user=self.stranger).exists())
+
+    def test_badge_in_header_and_reset_on_follow_feed(self):
+        """Бейдж виден в шапке и пропадает после открытия подписок"""
+        self.publish()
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, 'badge bg-danger')
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, 'badge bg-danger')
+        self.assertEqual(UnreadCounter.objects.get(user=self.reader).count, 0)
+
+    def test_count_is_read_from_cache(self):
+        """Счётчик читается из кэша, а не из базы"""
+        self.publish()
+        self.unread(self.reader_client)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.reader), 1)
+
+    def test_badge_change_breaks_etag(self):
+        """Новый пост подписки и прочтение меняют ETag любой страницы"""
+        url = reverse('posts:profile', args=['Stranger'])
+        etag = self.reader_client.get(url)['ETag']
+        self.publish()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'badge bg-danger')
+        etag = response['ETag']
+        self.reader_client.get(reverse('posts:follow_index'))
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'badge bg-danger')
@@ -1,3 +1,4 @@
+import hashlib
 import tempfile
 import shutil
 
@@ -37,6 +38,7 @@ class PostsPagesTests(TestCase):
             content=img,
             content_type='image/gif'
         )
+        cls.image_name = f'posts/{hashlib.sha256(img).hexdigest()}.gif'
         cls.group = Group.objects.create(title='Test_group', slug='Test_group')
         cls.group2 = Group.objects.create(title='Test_group',
                                           slug='Test_group2')
@@ -75,7 +77,7 @@ class PostsPagesTests(TestCase):
                        'group': self.group,
                        'text': self.post.text,
                        'pk': self.post.pk,
-                       'image': 'posts/image.gif',
+                       'image': self.image_name,
                        }
         for field, value in post_fields.items():
             with self.subTest(field=field):
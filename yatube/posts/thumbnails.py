@@ -0,0 +1,182 @@
+import logging
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import metrics
+from core.tasks import task
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'PNG': 'image/png'}
+
+Variant = namedtuple('Variant', 'width format geometry options')
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Не режет картинки в запросе: на промахе отдаёт оригинал."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        cached = self.get_cached_thumbnail(file_, geometry_string, **options)
+        if cached is not None:
+            return cached
+        schedule_thumbnails(file_)
+        return ImageFile(file_)
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options))
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, под которым её ищут в KV-хранилище."""
+        source = ImageFile(file_)
+        options = self._get_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def generate(self, file_, geometry_string, **options):
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _get_options(self, source, options):
+        # Повторяет подготовку опций из ThumbnailBackend.get_thumbnail,
+        # чтобы ключ в KV-хранилище совпадал с ключом при генерации.
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+
+@lru_cache(maxsize=None)
+def image_formats():
+    """Форматы из настроек, которые умеет кодировать Pillow."""
+    return tuple(
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format != 'WEBP' or features.check('webp')
+    )
+
+
+def thumbnail_variants():
+    """Ширины и форматы миниатюр, которые используют шаблоны."""
+    width, height = settings.POST_IMAGE_SIZE
+    for variant_width in settings.POST_IMAGE_WIDTHS:
+        geometry = f'{variant_width}x{round(height * variant_width / width)}'
+        for image_format in image_formats():
+            yield Variant(variant_width, image_format, geometry,
+                          {'crop': 'center', 'upscale': True,
+                           'format': image_format})
+
+
+class BatchKVStore(cached_db_kvstore.KVStore):
+    """KV-хранилище sorl, которое умеет искать записи пачкой."""
+
+    def get_many(self, image_files):
+        keys = {add_prefix(image_file.key) for image_file in image_files}
+        values = self.cache.get_many(keys)
+        missing = keys - values.keys()
+        if missing:
+            found = dict(KVStoreModel.objects.filter(
+                key__in=missing).values_list('key', 'value'))
+            values.update(found)
+            # Промахи тоже кэшируем, как это делает _get_raw.
+            self.cache.set_many(
+                {key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+                 for key in missing},
+                sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+            )
+        return {
+            image_file.key: deserialize_image_file(value)
+            for image_file in image_files
+            for value in [values.get(add_prefix(image_file.key))]
+            if value is not None and value != cached_db_kvstore.EMPTY_VALUE
+        }
+
+
+def variant_files(image):
+    return [(variant, default.backend.thumbnail_file(
+        image, variant.geometry, **variant.options))
+        for variant in thumbnail_variants()]
+
+
+def group_variants(thumbnails):
+    """Готовые миниатюры по форматам или None, если чего-то не хватает."""
+    sources = {}
+    for variant, thumbnail in thumbnails:
+        if thumbnail is None:
+            return None
+        sources.setdefault(variant.format, []).append((variant, thumbnail))
+    return sources
+
+
+def cached_variants(image):
+    return group_variants(
+        (variant, default.kvstore.get(thumbnail_file))
+        for variant, thumbnail_file in variant_files(image))
+
+
+def prefetch_variants(posts):
+    """Находит миниатюры всех постов страницы одним обращением к KV."""
+    files = [(post, variant_files(post.image)) for post in posts
+             if post.image]
+    found = default.kvstore.get_many(
+        [thumbnail_file for _, pairs in files
+         for _, thumbnail_file in pairs])
+    for post, pairs in files:
+        post.image_variants = group_variants(
+            (variant, found.get(thumbnail_file.key))
+            for variant, thumbnail_file in pairs)
+
+
+def pending_key(name):
+    return f'thumbnails:pending:{name}'
+
+
+@task(priority=10)
+def generate_thumbnails(name):
+    """Создаёт миниатюры всех размеров, которые используют шаблоны.
+
+    Картинку, которую не удаётся открыть, sorl молча пропускает; такая
+    отмечается в кэше без срока, и schedule_thumbnails её больше не
+    ставит, а шаблоны отдают оригинал.
+    """
+    source = ImageFile(name, Post.image.field.storage)
+    try:
+        default.engine.cleanup(default.engine.get_image(source))
+    except Exception:
+        # Ловим то же, что и sorl: Pillow бросает не только OSError.
+        logger.warning('Не удалось открыть картинку %s', name,
+                       exc_info=True)
+        cache.set(pending_key(name), 'failed', None)
+        metrics.incr('thumbnails.failed')
+        return
+    for variant in thumbnail_variants():
+        default.backend.generate(source, variant.geometry, **variant.options)
+
+
+def schedule_thumbnails(image):
+    """Ставит генерацию миниатюр в очередь фоновых задач.
+
+    Кэш отсекает повторные промахи без обращения к базе, а ключ задачи
+    не даёт поставить картинку дважды, если кэш её уже забыл.
+    """
+    name = getattr(image, 'name', image)
+    if name and cache.add(pending_key(name), 'pending',
+                          settings.THUMBNAIL_PENDING_TIMEOUT):
+        generate_thumbnails.enqueue((name,), key=f'thumbnails:{name}')
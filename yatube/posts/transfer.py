@@ -0,0 +1,244 @@
+import datetime
+import gzip
+import json
+import os
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .follows import recount
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     ImportCheckpoint, Post, User)
+from .stats import record_posts
+
+# Порядок важен: модель идёт после всех, на которые она ссылается.
+MODELS = (User, Group, Post, Comment, ArchivedPost, ArchivedComment, Follow)
+MODELS_BY_LABEL = {model._meta.label_lower: model for model in MODELS}
+# Строка с тем же уникальным значением может уже быть в базе: тогда
+# загружаемая не вставляется, а ссылки на неё ведут на имеющуюся.
+NATURAL_KEYS = {User: 'username', Group: 'slug'}
+# Архив хранит посты и комментарии с прежними ключами, поэтому сдвиг
+# у свежей и архивной таблицы общий.
+POST_KEYS = (Post, ArchivedPost)
+COMMENT_KEYS = (Comment, ArchivedComment)
+KEY_SPACES = {Post: POST_KEYS, ArchivedPost: POST_KEYS,
+              Comment: COMMENT_KEYS, ArchivedComment: COMMENT_KEYS}
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder обрезает время до миллисекунд, а выгрузка
+    # должна возвращать строки без потерь.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def open_data(path, mode):
+    """Открывает файл выгрузки, .gz сжимается на лету."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def natural_lookups(model):
+    """Ссылки model на модели с естественным ключом: {attname: lookup}."""
+    return {field.attname: f'{field.name}__{NATURAL_KEYS[field.related_model]}'
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model in NATURAL_KEYS}
+
+
+def export_records(chunk_size):
+    """Строки всех таблиц по одной, в памяти не больше chunk_size.
+
+    Рядом со ссылками на пользователей и группы пишутся их username
+    и slug: по ним загрузка находит строку, не запоминая ключи.
+    """
+    for model in MODELS:
+        fields = [field.attname for field in model._meta.concrete_fields]
+        lookups = natural_lookups(model)
+        rows = (model._base_manager.order_by('pk')
+                .values(*fields, *lookups.values())
+                .iterator(chunk_size=chunk_size))
+        for row in rows:
+            record = {'model': model._meta.label_lower, 'fields': row}
+            if lookups:
+                record['natural'] = {attname: row.pop(lookup)
+                                     for attname, lookup in lookups.items()}
+            yield record
+
+
+def export_data(path, chunk_size):
+    count = 0
+    with open_data(path, 'w') as file:
+        for record in export_records(chunk_size):
+            file.write(json.dumps(record, cls=ExportEncoder,
+                                  ensure_ascii=False))
+            file.write('\n')
+            count += 1
+    return count
+
+
+def current_offsets():
+    """Сдвиг ключей для каждой модели: новые строки встают после старых."""
+    return {
+        model._meta.label_lower: max(
+            part._base_manager.aggregate(top=Max('pk'))['top'] or 0
+            for part in KEY_SPACES.get(model, (model,)))
+        for model in MODELS
+    }
+
+
+def resolve_natural(model, records):
+    """Ключи строк, на которые ссылается пачка: {attname: {значение: pk}}.
+
+    Один запрос на каждую ссылку: совпавшие при загрузке и загруженные
+    строки находятся одинаково, по username или slug.
+    """
+    keys = {}
+    for field in model._meta.concrete_fields:
+        if not field.is_relation or field.related_model not in NATURAL_KEYS:
+            continue
+        key = NATURAL_KEYS[field.related_model]
+        values = {record['natural'][field.attname] for record in records
+                  if record.get('natural', {}).get(field.attname)
+                  is not None}
+        keys[field.attname] = dict(field.related_model._base_manager.filter(
+            **{f'{key}__in': values}).values_list(key, 'pk'))
+    return keys
+
+
+def remap(model, record, offsets, keys):
+    """Объект для вставки: ключи сдвинуты, ссылки ведут на новые строки."""
+    fields = dict(record['fields'])
+    natural = record.get('natural', {})
+    fields['id'] += offsets[model._meta.label_lower]
+    for field in model._meta.concrete_fields:
+        value = fields.get(field.attname)
+        if field.is_relation and value is not None:
+            label = field.related_model._meta.label_lower
+            fields[field.attname] = keys.get(field.attname, {}).get(
+                natural.get(field.attname), value + offsets[label])
+    return model(**fields)
+
+
+def match_existing(model, records):
+    """Убирает из records строки, которые уже есть в базе."""
+    key = NATURAL_KEYS.get(model)
+    if key is None:
+        return records
+    found = set(model._base_manager.filter(
+        **{f'{key}__in': [record['fields'][key] for record in records]})
+        .values_list(key, flat=True))
+    return [record for record in records
+            if record['fields'][key] not in found]
+
+
+class Checkpoint:
+    """Номер последней загруженной строки и сдвиги ключей; лежит в базе
+    и пишется в одной транзакции с пачкой.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+
+    def load(self):
+        state = ImportCheckpoint.objects.filter(path=self.path).values_list(
+            'state', flat=True).first()
+        return json.loads(state) if state else None
+
+    def save(self, state):
+        ImportCheckpoint.objects.update_or_create(
+            path=self.path, defaults={'state': json.dumps(state)})
+
+    def delete(self):
+        ImportCheckpoint.objects.filter(path=self.path).delete()
+
+
+@contextmanager
+def raw_dates(model):
+    """Как raw=True у loaddata: pub_date и created с auto_now_add берутся
+    из выгрузки, а не заменяются текущим временем.
+    """
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def insert_batch(model, objs):
+    # Подписка на совпавшего пользователя может уже быть в базе.
+    with raw_dates(model):
+        model._base_manager.bulk_create(objs,
+                                        ignore_conflicts=model is Follow)
+    update_counters(model, objs)
+
+
+def update_counters(model, objs):
+    """Поправляет GroupStats и FollowCounts под вставленную пачку."""
+    if model in (Post, ArchivedPost):
+        record_posts(model.objects.filter(pk__in=[obj.pk for obj in objs]))
+    elif model is Follow:
+        # Часть подписок могла уже быть, поэтому пересчёт, а не приращение.
+        recount({user_id for obj in objs
+                 for user_id in (obj.user_id, obj.author_id)})
+
+
+def import_data(path, batch_size, log=None):
+    """Загружает выгрузку пачками, продолжая с контрольной точки."""
+    checkpoint = Checkpoint(path)
+    state = checkpoint.load() or {'line': 0, 'offsets': current_offsets()}
+    imported = 0
+    batch, batch_model = [], None
+
+    def flush(line):
+        nonlocal imported
+        # Пачка и контрольная точка фиксируются вместе: после обрыва
+        # ни одна строка не загрузится дважды и ни одна не пропадёт.
+        with transaction.atomic():
+            records = match_existing(batch_model, batch)
+            keys = resolve_natural(batch_model, records)
+            insert_batch(batch_model,
+                         [remap(batch_model, record, state['offsets'], keys)
+                          for record in records])
+            state['line'] = line
+            checkpoint.save(state)
+        imported += len(records)
+        if log:
+            log(f'{batch_model._meta.label_lower}: строка {line}')
+        batch.clear()
+
+    with open_data(path, 'r') as file:
+        line = 0
+        for line, text in enumerate(file, start=1):
+            if line <= state['line']:
+                continue
+            record = json.loads(text)
+            model = MODELS_BY_LABEL[record['model']]
+            if batch and (model is not batch_model
+                          or len(batch) >= batch_size):
+                flush(line - 1)
+            batch_model = model
+            batch.append(record)
+        if batch:
+            flush(line)
+
+    reset_sequences()
+    checkpoint.delete()
+    return imported
+
+
+def reset_sequences():
+    """После вставки с явными ключами сдвигает автоинкремент в базе."""
+    statements = connection.ops.sequence_reset_sql(no_style(), MODELS)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+from core.tasks import release_key, task
+from .models import Comment, Post, TrendingLandmark, TrendingPost
+
+COMPACT_KEY = 'trending:compact'
+# 2 ** 1024 уже не помещается во float. Если сжатие давно не шло
+# (воркер стоял), bump сжимает счета сам, задолго до переполнения.
+MAX_HALF_LIVES = 64
+
+
+def current_landmark():
+    """Строка с точкой отсчёта весов; вызывать внутри транзакции.
+
+    Блокировка не даёт compact() сдвинуть точку между чтением и записью
+    веса, иначе вклад посчитался бы в старой шкале.
+    """
+    landmark, _ = (TrendingLandmark.objects.select_for_update()
+                   .get_or_create(pk=1, defaults={'moment': timezone.now()}))
+    return landmark
+
+
+def decay_weight(moment, landmark):
+    """Вес события в шкале landmark: удваивается каждые полжизни."""
+    age = (moment - landmark).total_seconds()
+    return 2 ** (age / settings.TRENDING_HALF_LIFE)
+
+
+def bump(post_id, weight=None, moment=None):
+    """Добавляет посту событие весом weight, двумя короткими запросами."""
+    weight = settings.TRENDING_COMMENT_WEIGHT if weight is None else weight
+    moment = moment or timezone.now()
+    with transaction.atomic():
+        landmark = current_landmark()
+        age = (moment - landmark.moment).total_seconds()
+        if age > settings.TRENDING_HALF_LIFE * MAX_HALF_LIVES:
+            compact(moment)
+            landmark = current_landmark()
+        TrendingPost.objects.bulk_create([TrendingPost(post_id=post_id)],
+                                         ignore_conflicts=True)
+        TrendingPost.objects.filter(post_id=post_id).update(
+            score=F('score') + weight * decay_weight(moment,
+                                                     landmark.moment))
+    schedule_compaction()
+
+
+def trending_posts(limit=None):
+    """Самые обсуждаемые сейчас посты: одно чтение по индексу score."""
+    limit = limit or settings.TRENDING_SIZE
+    return (Post.objects.filter(trending__isnull=False)
+            .select_related('author', 'group')
+            .order_by('-trending__score', '-pk')[:limit])
+
+
+def compact(now=None):
+    """Переносит точку отсчёта на now и выбрасывает остывшие посты.
+
+    Все счета делятся на один множитель, поэтому порядок не меняется,
+    а числа не растут до переполнения. Возвращает число удалённых строк.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        landmark = current_landmark()
+        # Обратный вес, а не 1 / вес: после долгого простоя он просто
+        # уходит в ноль, а не переполняется.
+        factor = decay_weight(landmark.moment, now)
+        TrendingPost.objects.update(score=F('score') * factor)
+        removed, _ = TrendingPost.objects.filter(
+            score__lt=settings.TRENDING_MIN_SCORE).delete()
+        landmark.moment = now
+        landmark.save(update_fields=['moment'])
+    metrics.incr('trending.compacted', removed)
+    return removed
+
+
+def rebuild(now=None):
+    """Пересчитывает счета по комментариям за последние полжизни × 10."""
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_HALF_LIFE * 10)
+    scores = {}
+    comments = (Comment.objects.filter(created__gte=since)
+                .values_list('post_id', 'created').iterator())
+    for post_id, created in comments:
+        scores[post_id] = (scores.get(post_id, 0)
+                           + settings.TRENDING_COMMENT_WEIGHT
+                           * decay_weight(created, now))
+    with transaction.atomic():
+        landmark = current_landmark()
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post_id=post_id, score=score)
+            for post_id, score in scores.items()
+            if score >= settings.TRENDING_MIN_SCORE)
+        landmark.moment = now
+        landmark.save(update_fields=['moment'])
+    return len(scores)
+
+
+@task(priority=-10)
+def compact_trending():
+    # Ключ снимается до работы: bump во время сжатия поставит следующее.
+    release_key(COMPACT_KEY)
+    compact()
+    schedule_compaction()
+
+
+def schedule_compaction():
+    """Держит в очереди одну отложенную задачу сжатия счетов.
+
+    Повтор отсекает ключ задачи в базе, а не кэш: после сброса кэша
+    или упавшей задачи сжатие не пропадёт и не задвоится.
+    """
+    compact_trending.enqueue(countdown=settings.TRENDING_COMPACT_INTERVAL,
+                             key=COMPACT_KEY)
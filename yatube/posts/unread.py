@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from core.tasks import task
+from .models import Follow, UnreadCounter
+
+# SQLite не принимает больше 999 параметров в одном запросе.
+BATCH_SIZE = 500
+
+
+def unread_key(user_id):
+    return f'unread:{user_id}'
+
+
+def unread_count(user):
+    """Число непрочитанных постов подписок: обычно одно чтение из кэша."""
+    if not user.is_authenticated:
+        return 0
+    key = unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = UnreadCounter.objects.filter(user_id=user.pk).values_list(
+            'count', flat=True).first() or 0
+        cache.set(key, count, settings.UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def mark_read(user):
+    """Сбрасывает счётчик; пишет в базу, только если было что сбросить."""
+    if unread_count(user):
+        UnreadCounter.objects.filter(user_id=user.pk).update(count=0)
+        cache.set(unread_key(user.pk), 0, settings.UNREAD_CACHE_TIMEOUT)
+
+
+@task
+def fan_out_post(author_id):
+    """Прибавляет новый пост автора к счётчикам всех его подписчиков."""
+    follower_ids = list(Follow.objects.filter(author_id=author_id)
+                        .values_list('user_id', flat=True))
+    for start in range(0, len(follower_ids), BATCH_SIZE):
+        batch = follower_ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            UnreadCounter.objects.bulk_create(
+                [UnreadCounter(user_id=user_id) for user_id in batch],
+                ignore_conflicts=True)
+            UnreadCounter.objects.filter(user_id__in=batch).update(
+                count=F('count') + 1)
+        cache.delete_many([unread_key(user_id) for user_id in batch])
+
+
+def notify_followers(post):
+    fan_out_post.delay(post.author_id)
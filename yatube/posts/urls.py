@@ -1,11 +1,21 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('rss/', feeds.index_rss, name='index_rss'),
+    path('atom/', feeds.index_atom, name='index_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_atom, name='group_atom'),
+    path('profile/<str:username>/rss/', feeds.author_rss,
+         name='profile_rss'),
+    path('profile/<str:username>/atom/', feeds.author_atom,
+         name='profile_atom'),
+    path('trending/', views.trending, name='trending'),
+    path('groups/', views.group_list, name='groups'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
@@ -14,6 +24,18 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/bulk/', views.follow_bulk, name='follow_bulk'),
+    path('fragments/index/', views.index_fragment, name='index_fragment'),
+    path('fragments/group/<slug:slug>/', views.group_fragment,
+         name='group_fragment'),
+    path('fragments/profile/<str:username>/', views.profile_fragment,
+         name='profile_fragment'),
+    path('fragments/follow/', views.follow_fragment,
+         name='follow_fragment'),
+    path('profile/<str:username>/followers/', views.followers,
+         name='followers'),
+    path('profile/<str:username>/following/', views.following,
+         name='following'),
     path('profile/<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
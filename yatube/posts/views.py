@@ -1,10 +1,30 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+from django.http import HttpResponseBadRequest
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
+from django.db.models import F
+from django.views.decorators.http import condition, require_POST
 
-from .models import Post, Group, User, Follow
+from core.pagination import (InvalidCursor, cursor_page, cursor_values,
+                             encode_cursor)
+from core.ratelimit import ratelimit
+from . import archive
+from .cache import (ARCHIVE_FEED, INDEX_FEED, author_feed, feed_etag,
+                    feed_generation, followers_feed, follows_feed,
+                    group_feed, invalidate_feeds, post_feed, post_feeds)
+from .models import ArchivedPost, Post, Group, User, Follow
+from .follows import follow, follow_counts, follow_many, unfollow
 from .forms import PostForm, CommentForm
+from .recommendations import recommendations_for
+from .stats import move_post, record_post
+from .thumbnails import schedule_thumbnails
+from .trending import bump, trending_posts
+from .unread import mark_read, notify_followers
+
+
+FEED_ORDERING = ('-pub_date', '-pk')
 
 
 def paginate(request, posts, page_count=settings.PAGINATE_POST_COUNT):
@@ -13,55 +33,181 @@ def paginate(request, posts, page_count=settings.PAGINATE_POST_COUNT):
     return paginator.get_page(page_number)
 
 
+def render_fragment(request, *querysets):
+    """Следующая пачка постов по курсору, без обвязки страницы.
+
+    Курсор следующей пачки уходит в X-Next-Cursor и Link.
+    """
+    querysets = [queryset.select_related('author', 'group')
+                 for queryset in querysets]
+    try:
+        posts, cursor = cursor_page(querysets, FEED_ORDERING,
+                                    request.GET.get('cursor'),
+                                    settings.PAGINATE_POST_COUNT)
+    except InvalidCursor:
+        return HttpResponseBadRequest('Неверный курсор')
+    response = render(request, 'posts/includes/post_list.html',
+                      {'page_obj': posts})
+    return link_next(response, request.path, cursor)
+
+
+def link_next(response, fragment_url, cursor):
+    """Курсор следующей пачки в X-Next-Cursor и Link."""
+    if cursor:
+        response['X-Next-Cursor'] = cursor
+        response['Link'] = f'<{fragment_url}?cursor={cursor}>; rel="next"'
+    return response
+
+
+def render_feed(request, template, context, fragment_url):
+    """Полная страница ленты, с которой можно продолжить по курсору.
+
+    Курсор после последнего поста страницы уходит в заголовки, как
+    у фрагмента, и в ссылку «Показать ещё» в паджинаторе.
+    """
+    page_obj = context['page_obj']
+    cursor = (encode_cursor(cursor_values(page_obj[-1], FEED_ORDERING))
+              if page_obj.has_next() else None)
+    context.update(next_cursor=cursor, fragment_url=fragment_url)
+    response = render(request, template, context)
+    return link_next(response, fragment_url, cursor)
+
+
+# Валидаторы для условного GET: поколения лент из кэша и, где нужно,
+# поиск ключа по уникальному индексу. Если ничего не менялось, ответ 304
+# уходит до пагинации и шаблонов.
+def index_etag(request):
+    return feed_etag(request, INDEX_FEED)
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return None
+    return feed_etag(request, group_feed(group_id), ARCHIVE_FEED)
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    return feed_etag(request, author_feed(author_id), ARCHIVE_FEED,
+                     follows_feed(request.user.pk), follows_feed(author_id),
+                     followers_feed(author_id))
+
+
+def post_etag(request, post_id):
+    # От ленты автора зависит число его постов на странице.
+    author_id = None
+    for model in (Post, ArchivedPost):
+        author_id = model.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True).first()
+        if author_id is not None:
+            break
+    if author_id is None:
+        return None
+    return feed_etag(request, post_feed(post_id), ARCHIVE_FEED,
+                     author_feed(author_id))
+
+
+@condition(etag_func=index_etag)
 def index(request):
     template = 'posts/index.html'
-    posts = Post.objects.all()
+    posts = Post.objects.order_by(*FEED_ORDERING)
     page_obj = paginate(request, posts)
-    context = {'page_obj': page_obj}
+    context = {'page_obj': page_obj,
+               'feed_generation': feed_generation(INDEX_FEED)}
+    return render_feed(request, template, context,
+                       reverse('posts:index_fragment'))
+
+
+def trending(request):
+    """Самые обсуждаемые сейчас посты, без пагинации."""
+    template = 'posts/trending.html'
+    context = {'page_obj': trending_posts()}
+    return render(request, template, context)
+
+
+GROUP_SORTS = {
+    'active': ('-stats__posts_7d', 'Активные за неделю'),
+    'today': ('-stats__posts_24h', 'Активные за сутки'),
+    'recent': ('-stats__last_post_at', 'Недавние'),
+    'popular': ('-stats__post_count', 'Больше всего записей'),
+}
+
+
+def group_list(request):
+    """Каталог групп по готовым счётчикам из GroupStats."""
+    template = 'posts/group_directory.html'
+    sort = request.GET.get('sort')
+    if sort not in GROUP_SORTS:
+        sort = 'active'
+    field = GROUP_SORTS[sort][0]
+    groups = Group.objects.select_related('stats').order_by(
+        F(field[1:]).desc(nulls_last=True), 'title')
+    context = {'page_obj': paginate(request, groups),
+               'sort': sort,
+               'sorts': {key: title
+                         for key, (_, title) in GROUP_SORTS.items()}}
     return render(request, template, context)
 
 
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = archive.group_posts(group)
     page_obj = paginate(request, posts)
     context = {'group': group,
                'page_obj': page_obj, }
-    return render(request, template, context)
+    return render_feed(request, template, context,
+                       reverse('posts:group_fragment', args=[slug]))
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    posts = archive.author_posts(author)
     page_obj = paginate(request, posts)
-    posts_count = posts.count()
+    posts_count = page_obj.paginator.count
     following = request.user.is_authenticated and Follow.objects.filter(
         user_id=request.user.id,
         author_id=author.id).exists()
+    followers_count, following_count = follow_counts(author)
     context = {'page_obj': page_obj,
                'posts_count': posts_count,
                'author': author,
                'following': following,
+               'followers_count': followers_count,
+               'following_count': following_count,
                }
-    return render(request, template, context)
+    return render_feed(request, template, context,
+                       reverse('posts:profile_fragment', args=[username]))
 
 
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
-    posts_count = post.author.posts.all().count()
+    post = Post.objects.filter(id=post_id).first()
+    if post is None:
+        # Старые посты живут в архиве под тем же id.
+        post = get_object_or_404(ArchivedPost, id=post_id)
+    posts_count = archive.author_posts(post.author).count()
     form = CommentForm()
     comments = post.comments.all()
     context = {'post': post,
                'posts_count': posts_count,
                'comments': comments,
-               'form': form}
+               'form': form,
+               'archived': isinstance(post, ArchivedPost)}
     return render(request, template, context)
 
 
 @login_required
+@ratelimit('post')
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -70,6 +216,11 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        record_post(new_post.group_id, new_post.pub_date)
+        notify_followers(new_post)
+        invalidate_feeds(*post_feeds(new_post))
+        if new_post.image:
+            schedule_thumbnails(new_post.image)
         return redirect('posts:profile', request.user.username)
 
     return render(request, template, {'form': form})
@@ -83,17 +234,38 @@ def post_edit(request, post_id):
     if post.author != request.user:
         return redirect('posts:post_detail', post_id)
 
+    old_group_id = post.group_id
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=post)
+    status = 200
+    version = request.POST.get('version', post.version)
 
     if form.is_valid():
-        form.save()
-        return redirect('posts:post_detail', post_id)
+        version = request.POST.get('version', '')
+        if form.save_changes(int(version) if version.isdigit() else None):
+            if form.changed_data:
+                move_post(old_group_id, post.group_id, post.pub_date)
+                invalidate_feeds(*post_feeds(post, old_group_id))
+            if 'image' in form.changed_data and post.image:
+                schedule_thumbnails(post.image)
+            return redirect('posts:post_detail', post_id)
+        form.add_error(None, 'Пост уже изменили в другом окне. '
+                             'Откройте его заново, чтобы увидеть чужие '
+                             'правки, или сохраните форму ещё раз, '
+                             'чтобы записать свою версию поверх.')
+        status = 409
+        # С устаревшей версией форму нельзя было бы сохранить никогда.
+        version = Post.objects.filter(pk=post_id).values_list(
+            'version', flat=True).first()
 
-    return render(request, template, {'form': form, 'is_edit': True})
+    context = {'form': form,
+               'is_edit': True,
+               'version': version}
+    return render(request, template, context, status=status)
 
 
 @login_required
+@ratelimit('comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -102,30 +274,102 @@ def add_comment(request, post_id):
         comment.author = request.user
         comment.post = post
         comment.save()
+        invalidate_feeds(post_feed(post.pk))
+        bump(post.pk, moment=comment.created)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = Post.objects.filter(
+        author__following__user=request.user).order_by(*FEED_ORDERING)
     page_obj = paginate(request, posts)
-    context = {'page_obj': page_obj}
-    return render(request, template, context)
+    mark_read(request.user)
+    context = {'page_obj': page_obj,
+               'recommendations': recommendations_for(request.user)}
+    return render_feed(request, template, context,
+                       reverse('posts:follow_fragment'))
+
+
+@condition(etag_func=index_etag)
+def index_fragment(request):
+    return render_fragment(request, Post.objects.all())
+
+
+@condition(etag_func=group_etag)
+def group_fragment(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return render_fragment(request, group.posts.all(),
+                           group.archived_posts.all())
+
+
+@condition(etag_func=profile_etag)
+def profile_fragment(request, username):
+    author = get_object_or_404(User, username=username)
+    return render_fragment(request, author.posts.all(),
+                           author.archived_posts.all())
 
 
 @login_required
-def profile_follow(request, username):
+def follow_fragment(request):
+    return render_fragment(request, Post.objects.filter(
+        author__following__user=request.user))
+
+
+def render_people(request, author, follows, field, title):
+    """Страница подписчиков или подписок по курсору в порядке -id.
+
+    Список совпадает со счётчиками: подписки удалённых пользователей
+    убирает purge_user вместе со счётчиками, а просто отключённые
+    остаются.
+    """
+    follows = follows.select_related(field)
+    try:
+        rows, cursor = cursor_page(follows, ('-pk',),
+                                   request.GET.get('cursor'),
+                                   settings.FOLLOW_LIST_PAGE_SIZE)
+    except InvalidCursor:
+        return HttpResponseBadRequest('Неверный курсор')
+    followers_count, following_count = follow_counts(author)
+    context = {'author': author,
+               'title': title,
+               'people': [getattr(row, field) for row in rows],
+               'next_cursor': cursor,
+               'followers_count': followers_count,
+               'following_count': following_count}
+    return render(request, 'posts/follow_list.html', context)
+
+
+def followers(request, username):
     author = get_object_or_404(User, username=username)
-    if author != request.user:
-        Follow.objects.get_or_create(user_id=request.user.id,
-                                     author_id=author.id)
+    return render_people(request, author, author.following.all(), 'user',
+                         'Подписчики')
+
+
+def following(request, username):
+    author = get_object_or_404(User, username=username)
+    return render_people(request, author, author.follower.all(), 'author',
+                         'Подписки')
+
+
+@login_required
+@ratelimit('follow', methods=('GET', 'POST'))
+def profile_follow(request, username):
+    follow(request.user, username)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user_id=request.user.id,
-                          author_id=author.id).delete()
+    unfollow(request.user, username)
     return redirect('posts:profile', username=username)
+
+
+@require_POST
+@login_required
+@ratelimit('follow')
+def follow_bulk(request):
+    usernames = request.POST.get('usernames', '').replace(',', ' ').split()
+    follow_many(request.user, usernames)
+    return redirect('posts:follow_index')
@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from core.admin import SoftDeleteAdmin
+from posts.cache import INDEX_FEED, SITE_FEED, author_feed, invalidate_feeds
+from posts.deletion import soft_delete_user
+
+User = get_user_model()
+
+
+class SoftDeleteUserAdmin(SoftDeleteAdmin, UserAdmin):
+    soft_delete = staticmethod(soft_delete_user)
+    list_display = UserAdmin.list_display + ('is_active',
+                                             'deletion_progress')
+    empty_value_display = '-пусто-'
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Имя автора выводится рядом с каждым его постом и комментарием.
+        invalidate_feeds(SITE_FEED, INDEX_FEED, author_feed(obj.pk))
+
+
+admin.site.unregister(User)
+admin.site.register(User, SoftDeleteUserAdmin)
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
@@ -71,7 +72,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'core.context_processors.year.year'
+                'core.context_processors.year.year',
+                'posts.context_processors.unread',
             ],
         },
     },
@@ -122,22 +124,151 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# collectstatic добавляет хэш к именам и кладёт рядом сжатые .gz копии.
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+STATIC_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+# Отдавать статику из Django; в бою её отдаёт фронтовой сервер.
+SERVE_STATIC = DEBUG
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# 'X-Accel-Redirect' (nginx) или 'X-Sendfile' (Apache, lighttpd): Django
+# только проверяет запрос, а байты отдаёт фронтовой сервер. None — файл
+# отдаёт сам Django.
+MEDIA_SENDFILE_HEADER = None
+# internal-location в nginx, который смотрит в MEDIA_ROOT.
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# ModelBackend оставлен вторым: сессии, открытые до перехода на
+# кэширующий бэкенд, хранят его путь и не должны разлогиниваться.
+AUTHENTICATION_BACKENDS = [
+    'core.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма копятся в таблице core.OutgoingEmail и уходят фоновой задачей
+# пачками через OUTBOX_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_FLUSH_DELAY = 5
+OUTBOX_MAX_ATTEMPTS = 5
+# Через сколько секунд пачку упавшего отправителя забирает другой.
+OUTBOX_CLAIM_TIMEOUT = 60 * 10
+OUTBOX_DEDUP_WINDOW = 60 * 15
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGINATE_POST_COUNT = 10
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Поколения лент для ETag хранятся в кэше, поэтому в бою он должен быть
+# общим для всех процессов (Memcached, Redis): manage.py check --deploy
+# предупредит о локальном.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Миниатюры режутся фоновой задачей сразу после загрузки картинки,
+# шаблонный тег {% thumbnail %} на промахе отдаёт оригинал.
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnails.BatchKVStore'
+# Сколько промахи по картинке не доходят до очереди задач в базе.
+THUMBNAIL_PENDING_TIMEOUT = 60 * 5
+# Ширины вариантов для srcset при кадрировании в POST_IMAGE_SIZE.
+# Форматы перечислены в порядке предпочтения, последний — запасной для <img>.
+POST_IMAGE_SIZE = (960, 339)
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('WEBP', 'JPEG')
+
+# Загруженные картинки ужимаются и перекодируются перед сохранением.
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+POST_IMAGE_QUALITY = 82
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Очередь отложенных задач в базе: python manage.py run_tasks.
+# TASKS_EAGER выполняет задачи сразу при постановке, без воркера.
+TASKS_EAGER = False
+TASKS_WORKERS = 4
+TASKS_POLL_INTERVAL = 1
+TASKS_RETRY_DELAY = 10
+TASKS_VISIBILITY_TIMEOUT = 60 * 10
+
+# Лимиты на запись: scope -> (запросов, за сколько секунд).
+# Корзины хранятся в кэше по пользователю или по адресу клиента.
+RATELIMIT_ENABLED = True
+# За nginx адрес клиента приходит в заголовке: например,
+# 'HTTP_X_FORWARDED_FOR' и число прокси, дописывающих его, перед Django.
+RATELIMIT_PROXY_HEADER = None
+RATELIMIT_PROXY_COUNT = 1
+RATELIMITS = {
+    'post': (30, 60 * 10),
+    'comment': (30, 60),
+    'follow': (60, 60),
+    'signup': (20, 60 * 60),
+}
+# Счётчики ответов 429 копятся в кэше, воркер задач раз в столько
+# секунд переносит их в базу.
+METRICS_FLUSH_INTERVAL = 60
+
+# Посты старше этого срока archive_posts переносит в архивные таблицы,
+# профиль и группа читают архив, только когда свежие страницы кончились.
+POST_ARCHIVE_AFTER_DAYS = 365 * 2
+POST_ARCHIVE_COUNT_TTL = 60 * 60
+
+# Удаление пользователей, групп и постов: объект сразу скрывается,
+# а зависимые строки фоновая задача удаляет пачками такого размера.
+DELETION_BATCH_SIZE = 500
+
+# JSON API: размер страницы по умолчанию и предел для ?limit=.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# RSS/Atom: сколько последних записей в ленте и сколько держать XML в кэше.
+SYNDICATION_ITEMS = 20
+SYNDICATION_CACHE_TIMEOUT = 60 * 60
+
+# Каталог групп: как часто пересчитывать окна активности за сутки и неделю.
+GROUP_STATS_REFRESH_INTERVAL = 60 * 10
+
+# «Популярное»: счёт поста от комментариев затухает вдвое за
+# TRENDING_HALF_LIFE секунд; задача раз в TRENDING_COMPACT_INTERVAL
+# переносит точку отсчёта и выбрасывает посты со счётом ниже минимума.
+TRENDING_HALF_LIFE = 60 * 60 * 6
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_MIN_SCORE = 0.05
+TRENDING_COMPACT_INTERVAL = 60 * 60
+TRENDING_SIZE = 50
+
+# Счётчик непрочитанных постов подписок в шапке: сколько держать в кэше.
+UNREAD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сессии живут в кэше, а в базу попадают не чаще раза в
+# SESSION_WRITE_BEHIND_DELAY секунд; пользователь сессии тоже кэшируется.
+# Оба требуют общего для процессов кэша (manage.py check --deploy).
+# USER_CACHE_TIMEOUT ограничивает, сколько живёт пользователь, изменённый
+# в обход сигналов модели.
+SESSION_ENGINE = 'core.sessions'
+SESSION_WRITE_BEHIND_DELAY = 30
+USER_CACHE_TIMEOUT = 60 * 5
+
+# Списки подписчиков и подписок: сколько пользователей на странице.
+FOLLOW_LIST_PAGE_SIZE = 50
+
+# Рекомендации авторов (build_recommendations): сколько хранить и
+# показывать на пользователя, сколько соседей брать на каждом шаге обхода
+# графа, вес совместных подписок, по сколько пользователей писать в базу
+# и сколько памяти в байтах можно отдать под граф.
+RECOMMENDATIONS_COUNT = 20
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATIONS_FANOUT = 30
+RECOMMENDATIONS_CO_FOLLOW_WEIGHT = 0.5
+RECOMMENDATIONS_BATCH_SIZE = 500
+RECOMMENDATIONS_MEMORY_LIMIT = 512 * 2 ** 20